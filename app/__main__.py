@@ -1,15 +1,26 @@
 import logging
+import sys
 
+from aerich import Command
 from aiogram import types
 from aiogram_dialog import setup_dialogs
 from pyrogram import Client
 from tortoise import Tortoise, connections
 
-from app import config, monkeypatch  # noqa
+from app import config, metrics, monkeypatch  # noqa
 from app.config import TORTOISE_ORM
 from app.dialogs import dialogs
-from app.middlewares import ACLMiddleware, DatabaseI18nMiddleware
+from app.middlewares import ACLMiddleware, DatabaseI18nMiddleware, MetricsMiddleware
 from app.misc import bot, dp, get_client, i18n, set_client
+from app.services.extract import extractor_pool
+from app.services.gpt import gpt_client
+from app.services.homework_jobs import homework_queue
+from app.services.invites import unknown_invites
+from app.services.summary_cache import summary_cache
+from app.services.user_cache import user_cache
+from app.sharding import ShardingMiddleware, run_workers
+from app.webhook import run_webhook, set_webhook
+from app.widgets import Emojize
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,19 +29,83 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+metrics.registry.register(
+    metrics.CacheStats(
+        "edulink_cache",
+        {
+            "users": user_cache.local,
+            "jinja": monkeypatch.jinja_cache,
+            "summaries": summary_cache.local,
+            "unknown_invites": unknown_invites.local,
+        },
+    )
+)
+
+
+async def migrate() -> None:
+    """
+    Applies new migrations from migrations/. SQLite is meant for local runs
+    only, so its schema is generated from models instead.
+    """
+    if connections.get("default").capabilities.dialect == "sqlite":
+        await Tortoise.generate_schemas()
+        return
+
+    command = Command(TORTOISE_ORM, location=config.MIGRATIONS_LOCATION)
+    await command.init()
+    if migrated := await command.upgrade(run_in_transaction=True):
+        logger.info("Applied migrations: %s", ", ".join(migrated))
+
 
 @dp.startup()
-async def on_startup() -> None:
-    await bot.delete_webhook(drop_pending_updates=True)
+async def on_startup(worker_id: int | None = None) -> None:
+    """
+    :param worker_id: Shard number if the process is a worker (see app.sharding),
+        None for the process that receives updates from Telegram.
+    """
+    is_receiver = worker_id is None
+    is_forwarder = is_receiver and config.SHARDS > 0
 
+    if is_receiver and config.RUN_MODE == "webhook":
+        await set_webhook()
+    elif is_receiver:
+        await bot.delete_webhook(drop_pending_updates=True)
+
+    if is_forwarder:
+        dp.update.outer_middleware(ShardingMiddleware(config.SHARDS))
+    else:
+        dp.update.outer_middleware(MetricsMiddleware())
+        dp.message.middleware(MetricsMiddleware.label_handler)
+        dp.callback_query.middleware(MetricsMiddleware.label_handler)
+        bot.session.middleware(metrics.RequestMetricsMiddleware())
     dp.update.middleware(ACLMiddleware())
     dp.update.middleware(DatabaseI18nMiddleware(i18n))
 
     dp.include_routers(*dialogs)
     setup_dialogs(dp)
+    if not is_forwarder:
+        count = Emojize.precompile(i18n, config.LOCALES)
+        logger.info("Precompiled %d Emojize texts", count)
+        count = monkeypatch.precompile_jinja(i18n, config.LOCALES)
+        logger.info("Precompiled %d Jinja templates", count)
 
     await Tortoise.init(TORTOISE_ORM)
-    await Tortoise.generate_schemas()
+    metrics.instrument_db()
+    if config.METRICS_PORT:
+        port = config.METRICS_PORT + (0 if is_receiver else 1 + worker_id)
+        dp["metrics_runner"] = await metrics.start_server(config.METRICS_HOST, port)
+        logger.info("Metrics are served on port %d", port)
+
+    if not is_receiver:
+        # schemas and commands are set up once, by the receiving process.
+        # bot.me() is cached per Bot instance, fetch it before updates arrive
+        await bot.me()
+        await start_client(f"my_bot_{worker_id}")
+        homework_queue.start(bot, config.HOMEWORK_WORKERS)
+        return
+
+    await migrate()
+    await summary_cache.purge()
 
     await bot.set_my_commands(
         [
@@ -41,8 +116,21 @@ async def on_startup() -> None:
         scope=types.BotCommandScopeAllPrivateChats(),
     )
 
+    if not is_forwarder:
+        await bot.me()
+        await start_client("my_bot")
+        # after migrate(), which creates the queue table
+        homework_queue.start(bot, config.HOMEWORK_WORKERS)
+
+
+async def start_client(name: str) -> None:
+    """
+    Starts pyrogram client of this process.
+    :param name: Session name. Must be unique per process, as the session is
+        stored in an SQLite file that can't be shared.
+    """
     client = Client(
-        "my_bot",
+        name,
         api_id=config.API_ID,
         api_hash=config.API_HASH,
         bot_token=config.BOT_TOKEN,
@@ -53,9 +141,25 @@ async def on_startup() -> None:
 
 @dp.shutdown()
 async def on_shutdown() -> None:
-    await get_client().stop()
+    # running jobs are returned to the queue
+    await homework_queue.stop()
+    if client := get_client():
+        await client.stop()
+    if runner := dp.workflow_data.get("metrics_runner"):
+        await runner.cleanup()
+    await gpt_client.close()
+    extractor_pool.shutdown()
     await connections.close_all()
 
+    logger.info("User cache stats: %s", user_cache.stats())
+    logger.info("Jinja cache stats: %s", monkeypatch.jinja_cache.stats())
+
 
 if __name__ == "__main__":
-    dp.run_polling(bot, allowed_updates=["message", "callback_query"])
+    match sys.argv[1:]:
+        case ["worker", *shards]:
+            run_workers(map(int, shards) if shards else range(config.SHARDS))
+        case _ if config.RUN_MODE == "webhook":
+            run_webhook()
+        case _:
+            dp.run_polling(bot, allowed_updates=config.ALLOWED_UPDATES)
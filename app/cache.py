@@ -0,0 +1,108 @@
+"""
+In-process caches.
+"""
+
+import functools
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, ParamSpec, TypeVar
+
+from aiogram_dialog import DialogManager
+
+_MISSING = object()
+REQUEST_CACHE_KEY = "request_cache"
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+class LRUCache:
+    """
+    Bounded mapping with least-recently-used eviction and optional TTL.
+    Counts hits and misses, so the size can be tuned by looking at stats().
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None) -> None:
+        """
+        :param maxsize: Maximum number of entries. 0 disables caching.
+        :param ttl: Seconds an entry stays valid, or None to keep it until evicted.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, *, count: bool = True) -> Any:
+        item = self._data.get(key)
+        if item is not None and (self.ttl is None or item[0] > time.monotonic()):
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return item[1]
+
+        if item is not None:
+            del self._data[key]
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else 0.0
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def request_cached(
+    func: Callable[P, Awaitable[T]],
+) -> Callable[P, Awaitable[T]]:
+    """
+    Memoizes coroutine function for the time one update is processed, so that
+    handlers and getters of several windows rendered for it share DB queries.
+    The first argument must be DialogManager, results are kept in its
+    middleware data and keyed by the rest of arguments, which must be hashable.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(manager: DialogManager, *args: Hashable) -> T:
+        cache = manager.middleware_data.setdefault(REQUEST_CACHE_KEY, {})
+        key = (func, args)
+        if key not in cache:
+            cache[key] = await func(manager, *args)
+        return cache[key]
+
+    return wrapper
+
+
+def drop_request_cache(manager: DialogManager) -> None:
+    """
+    Forgets results of request_cached functions, call after modifying data.
+    """
+    manager.middleware_data.pop(REQUEST_CACHE_KEY, None)
@@ -11,14 +11,40 @@ YANDEX_API_KEY = env.str("YANDEX_API_KEY")
 YANDEX_FOLDER_ID = env.str("YANDEX_FOLDER_ID")
 API_ID = env.int("API_ID")
 API_HASH = env.str("API_HASH")
+# Base URL of a self-hosted Bot API server, e.g. http://localhost:8081.
+# Empty means api.telegram.org
+TELEGRAM_API_URL = env.str("TELEGRAM_API_URL", default="")
 
 DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite://db.sqlite3")
 
+# "polling" or "webhook"
+RUN_MODE = env.str("RUN_MODE", default="polling")
+ALLOWED_UPDATES = ["message", "callback_query"]
+# Public URL Telegram will send updates to, e.g. https://bot.example.com
+WEBHOOK_BASE_URL = env.str("WEBHOOK_BASE_URL", default="")
+WEBHOOK_PATH = env.str("WEBHOOK_PATH", default="/webhook")
+WEBHOOK_SECRET = env.str("WEBHOOK_SECRET", default="")
+WEBHOOK_HOST = env.str("WEBHOOK_HOST", default="0.0.0.0")
+WEBHOOK_PORT = env.int("WEBHOOK_PORT", default=8080)
+# Simultaneous HTTPS connections Telegram opens to the webhook, 1-100
+WEBHOOK_MAX_CONNECTIONS = env.int("WEBHOOK_MAX_CONNECTIONS", default=40)
+# Updates processed at once by a single process
+UPDATES_CONCURRENCY = env.int("UPDATES_CONCURRENCY", default=100)
+# Number of worker shards, see app/sharding.py. 0 handles updates in-process
+SHARDS = env.int("SHARDS", default=0)
+
+# Port of Prometheus /metrics, 0 disables it. Worker N listens on
+# METRICS_PORT + 1 + N. It is never served on the public webhook server
+METRICS_HOST = env.str("METRICS_HOST", default="0.0.0.0")
+METRICS_PORT = env.int("METRICS_PORT", default=0)
+
+# Aerich migrations, see [tool.aerich] in pyproject.toml
+MIGRATIONS_LOCATION = "./migrations"
 TORTOISE_ORM = {
     "connections": {"default": DATABASE_URL},
     "apps": {
         "models": {
-            "models": ["app.models"],
+            "models": ["app.models", "aerich.models"],
             "default_connection": "default",
         },
     },
@@ -37,4 +63,73 @@ DEFAULT_LOCALE = LOCALES["en"]
 FIGMA_URL = "https://www.figma.com/proto/nIJ6EyZJLfZpVtuLm9qmT2/Untitled?page-id=0%3A1&node-id=1-545&p=f&viewport=-60%2C173%2C0.29&t=IshnLMZRA7KhXim3-1&scaling=min-zoom&content-scaling=fixed&starting-point-node-id=1%3A545"
 FILE_SIZE_LIMIT_MB = 5
 
-GPT_SYMBOLS_LIMIT = 7000
+# Characters of a document sent to GPT, see app/services/sampling.py
+GPT_SYMBOLS_LIMIT = env.int("GPT_SYMBOLS_LIMIT", default=3000)
+# How they are chosen: "spread" drops boilerplate and samples the head, the
+# middle and the tail of the text, "clean" only drops boilerplate, "head"
+# takes the beginning of the text as is
+GPT_SAMPLING = env.str("GPT_SAMPLING", default="spread")
+# Yandex Foundation Models API, can point to benchmarks/fake_gpt.py
+GPT_API_URL = env.str("GPT_API_URL", default="https://llm.api.cloud.yandex.net")
+# Completions running at once, across all users
+GPT_CONCURRENCY = env.int("GPT_CONCURRENCY", default=10)
+# Seconds per HTTP request to Yandex Cloud
+GPT_TIMEOUT = env.float("GPT_TIMEOUT", default=30)
+GPT_RETRIES = env.int("GPT_RETRIES", default=3)
+# Use completionAsync + polling instead of the synchronous endpoint
+GPT_ASYNC_API = env.bool("GPT_ASYNC_API", default=False)
+
+# Summaries kept in memory of each process
+SUMMARY_CACHE_SIZE = env.int("SUMMARY_CACHE_SIZE", default=1000)
+# Summaries kept in the database, least recently used are removed first
+SUMMARY_CACHE_MAX_ROWS = env.int("SUMMARY_CACHE_MAX_ROWS", default=100_000)
+SUMMARY_CACHE_TTL_DAYS = env.int("SUMMARY_CACHE_TTL_DAYS", default=30)
+
+# Processes parsing documents, see app/services/extract.py
+EXTRACT_WORKERS = env.int("EXTRACT_WORKERS", default=2)
+# Characters of text extracted from a document, to sample GPT input from
+EXTRACT_SYMBOLS_LIMIT = env.int("EXTRACT_SYMBOLS_LIMIT", default=30_000)
+# Limits of a single parsing job
+EXTRACT_CPU_SECONDS = env.int("EXTRACT_CPU_SECONDS", default=10)
+EXTRACT_MEMORY_MB = env.int("EXTRACT_MEMORY_MB", default=512)
+
+# Homework submissions processed at once by each bot process,
+# see app/services/homework_jobs.py
+HOMEWORK_WORKERS = env.int("HOMEWORK_WORKERS", default=10)
+# Attempts of a submission before it is reported as failed
+HOMEWORK_JOB_ATTEMPTS = env.int("HOMEWORK_JOB_ATTEMPTS", default=5)
+# Seconds before the first retry, doubled after each failed attempt
+HOMEWORK_RETRY_DELAY = env.float("HOMEWORK_RETRY_DELAY", default=5)
+# Seconds after which a job of a crashed process is taken over by another one.
+# Must be longer than processing can take, including GPT retries
+HOMEWORK_JOB_LEASE = env.int("HOMEWORK_JOB_LEASE", default=300)
+# Seconds between checks for jobs enqueued by other processes or due for retry
+HOMEWORK_POLL_INTERVAL = env.float("HOMEWORK_POLL_INTERVAL", default=2)
+
+# Megabytes of submitted files held at once by a process, with their copies
+# passed to the extractor pool, see app/services/buffers.py. Downloads wait
+# while the budget is used up
+BUFFER_BUDGET_MB = env.int("BUFFER_BUDGET_MB", default=256)
+# Buffered files larger than this are spooled to disk instead of memory
+BUFFER_SPOOL_MB = env.int("BUFFER_SPOOL_MB", default=8)
+
+# Files downloaded at once when exporting a container
+EXPORT_DOWNLOAD_WORKERS = env.int("EXPORT_DOWNLOAD_WORKERS", default=4)
+# Deflate level of exported archives, 0-9
+EXPORT_COMPRESSLEVEL = env.int("EXPORT_COMPRESSLEVEL", default=6)
+# Archives larger than this are spooled to disk instead of memory
+EXPORT_SPOOL_MB = env.int("EXPORT_SPOOL_MB", default=32)
+# Format of exported grade tables: "xlsx" or "csv"
+EXPORT_TABLE_FORMAT = env.str("EXPORT_TABLE_FORMAT", default="xlsx")
+
+# Compiled Jinja templates, one per template and locale
+JINJA_CACHE_SIZE = env.int("JINJA_CACHE_SIZE", default=500)
+
+USER_CACHE_SIZE = env.int("USER_CACHE_SIZE", default=10_000)
+USER_CACHE_TTL = env.int("USER_CACHE_TTL", default=300)
+# TTL of the in-process tier when Redis is used. Other processes don't
+# invalidate it, so a user changed by them is served stale this long
+USER_CACHE_LOCAL_TTL = env.int("USER_CACHE_LOCAL_TTL", default=5)
+# Invite codes that were not found are not looked up again for this many seconds
+UNKNOWN_INVITES_CACHE_SIZE = env.int("UNKNOWN_INVITES_CACHE_SIZE", default=10_000)
+UNKNOWN_INVITES_TTL = env.int("UNKNOWN_INVITES_TTL", default=60)
@@ -10,6 +10,7 @@ from aiogram_dialog.widgets.text import Const
 
 from app.misc import BACK, BACK_STATE
 from app.models import Container, User
+from app.services.invites import unknown_invites
 from app.states import ContainerCreateSG, ContainersSG
 from app.utils import lazy_gettext as _
 from app.widgets import Emojize
@@ -40,6 +41,7 @@ async def container_create(
         deadline=datetime.datetime.fromisoformat(deadline) if deadline else None,
         owner=user,
     )
+    await unknown_invites.discard(container.invite_code)
 
     await manager.done(show_mode=ShowMode.NO_UPDATE)
     await manager.start(ContainersSG.view, {"container_id": container.id})
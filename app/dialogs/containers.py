@@ -1,42 +1,34 @@
-import datetime
-import io
 import logging
-import operator
-import re
 from typing import Any
 
-import PyPDF2
 from aiogram import Bot, F, types
-from aiogram.types import BufferedInputFile, User
+from aiogram.types import User
 from aiogram_dialog import Dialog, DialogManager, Window
 from aiogram_dialog.widgets.input import MessageInput
-from aiogram_dialog.widgets.kbd import (
-    Button,
-    Next,
-    ScrollingGroup,
-    Select,
-)
+from aiogram_dialog.widgets.kbd import Button, Next
 from aiogram_dialog.widgets.text import Case, Const, Format, Jinja
-from tortoise.expressions import Q
+from tortoise.expressions import Q, Subquery
+from tortoise.queryset import QuerySet
 
 from app import config
+from app.cache import drop_request_cache, request_cached
 from app.misc import BACK
-from app.models import Container, Homework
-from app.services.gpt import summarize_homework_text
+from app.models import Container, Homework, HomeworkJob
+from app.services.homework_jobs import ACTIVE_STATUSES, homework_queue
 from app.states import ContainersSG, HomeworksSG
-from app.utils import get_short_fio
 from app.utils import lazy_gettext as _
-from app.widgets import Emojize, StartWithSameData
+from app.widgets import Emojize, PaginatedSelect, StartWithSameData
 
 logger = logging.getLogger(__name__)
 
 
-async def containers_getter(user: User, **__: Any) -> dict[str, Any]:
-    return {
-        "containers": await Container.filter(
-            Q(owner=user) | (Q(participants=user) & ~Q(is_archived=True))
-        ).prefetch_related("owner"),
-    }
+def containers_query(__: dict, manager: DialogManager) -> QuerySet[Container]:
+    user = manager.middleware_data["user"]
+    participated = Container.filter(participants=user).values("id")
+    # subquery instead of join, so that every container is counted once
+    return Container.filter(
+        Q(owner=user) | (Q(id__in=Subquery(participated)) & Q(is_archived=False))
+    )
 
 
 async def open_container(
@@ -45,17 +37,41 @@ async def open_container(
     await manager.start(ContainersSG.view, data={"container_id": int(container_id)})
 
 
+@request_cached
+async def get_container_view(
+    __: DialogManager, container_id: int, user_id: int
+) -> Container:
+    """
+    Loads container together with IDs of the user's homework in it
+    and of the job processing it.
+    """
+    my_homework = Homework.filter(container_id=container_id, owner_id=user_id)
+    my_job = HomeworkJob.filter(
+        container_id=container_id, owner_id=user_id, status__in=ACTIVE_STATUSES
+    ).limit(1)
+    return await (
+        Container.filter(id=container_id)
+        .annotate(
+            my_homework_id=Subquery(my_homework.values("id")),
+            my_job_id=Subquery(my_job.values("id")),
+        )
+        .get()
+    )
+
+
 async def container_view_getter(
     dialog_manager: DialogManager, bot: Bot, user: User, **__: Any
 ) -> dict[str, Any]:
     container_id = dialog_manager.start_data["container_id"]
-    container = await Container.get(id=container_id).prefetch_related("owner")
+    container = await get_container_view(dialog_manager, container_id, user.id)
 
-    me = await bot.me()
+    me = await bot.me()  # cached by Bot after the first call
+    homework_id = container.my_homework_id
     return {
         "container": container,
-        "is_owner": container.owner.id == user.id,
-        "homework_sent": await Homework.get_or_none(container=container, owner=user),
+        "is_owner": container.owner_id == user.id,
+        "homework_sent": {"id": homework_id} if homework_id is not None else None,
+        "homework_processing": container.my_job_id is not None,
         "invite_link": f"https://t.me/{me.username}?start=cjoin_{container.invite_code}",
     }
 
@@ -64,39 +80,11 @@ async def archive_container(
     __: types.CallbackQuery, ___: Button, manager: DialogManager
 ) -> None:
     container_id = manager.start_data["container_id"]
-    container = await Container.get(id=container_id)
-    await container.update_from_dict({"is_archived": True}).save()
+    await Container.filter(id=container_id).update(is_archived=True)
+    drop_request_cache(manager)
     await manager.back()
 
 
-async def message_to_buffer(message: types.Message) -> io.BytesIO:
-    if message.text:
-        return io.BytesIO(message.text.encode())
-
-    buffer = io.BytesIO()
-    await message.bot.download(message.document.file_id, buffer)
-    return buffer
-
-
-async def get_file_title(file_name: str, file_ext: str, buffer: io.BytesIO) -> str:
-    match file_ext:
-        case "pdf":
-            pdf_reader = PyPDF2.PdfReader(buffer)
-            text = "".join([page.extract_text() for page in pdf_reader.pages])
-            title = "_" + await summarize_homework_text(text)
-        case "txt":
-            try:
-                text = buffer.read().decode("utf-8")
-            except UnicodeError:
-                title = ""
-            else:
-                title = "_" + await summarize_homework_text(text)
-        case _:
-            title = re.sub(r"[\s\-]", "_", re.sub(r"[^a-zA-Z0-9\s_\-]", "", file_name))
-
-    return title
-
-
 async def homework_handler(
     message: types.Message, __: MessageInput, manager: DialogManager
 ) -> None:
@@ -116,71 +104,71 @@ async def homework_handler(
 
         file_name, file_ext = parts
         file_ext = file_ext.lower()
-    else:
+    elif message.text:
         file_name = ""
         file_ext = "txt"
+    else:
+        # photos, stickers and the like have neither a file name nor text
+        await message.answer(_("Неверное имя файла."))
+        return
 
-    bot: Bot = manager.middleware_data["bot"]
     user = manager.middleware_data["user"]
+    container_id = manager.start_data["container_id"]
+    if await HomeworkJob.exists(chat_id=message.chat.id, message_id=message.message_id):
+        # the same update delivered again
+        return
+    if await HomeworkJob.exists(
+        owner=user, container_id=container_id, status__in=ACTIVE_STATUSES
+    ):
+        await message.answer(_("Решение уже отправлено."))
+        await manager.done()
+        return
 
-    await message.answer(_("Обработка...\n\nЭто займет до 30 секунд."))
-    buffer = await message_to_buffer(message)
-    title = await get_file_title(file_name, file_ext, buffer)
-
-    name = (
-        get_short_fio(user.fio)
-        + "_"
-        + datetime.datetime.now().strftime("%d_%m")
-        + title[:30].rstrip("_-")
-        + "."
-        + file_ext
-    )
-    sent = await bot.send_document(
-        config.UPLOAD_FILES_CHAT_ID,
-        BufferedInputFile(buffer.getvalue(), filename=name),
-    )
-
-    homework = await Homework.create(
-        owner=manager.middleware_data["user"],
-        container=await Container.get(id=manager.start_data["container_id"]),
-        text=message.text,
-        file_id=sent.document.file_id,
-        name=name,
-    )
-    await message.answer(
-        _("Отправлено! ID решения — <code>{homework.id}</code>").format(
-            homework=homework
+    status_message = await message.answer(_("Обработка...\n\nЭто займет до 30 секунд."))
+    enqueued = await homework_queue.enqueue(
+        HomeworkJob(
+            owner=user,
+            container_id=container_id,
+            chat_id=message.chat.id,
+            message_id=message.message_id,
+            status_message_id=status_message.message_id,
+            text=message.text,
+            file_id=message.document.file_id if message.document else None,
+            file_unique_id=message.document.file_unique_id
+            if message.document
+            else None,
+            file_name=file_name,
+            file_ext=file_ext,
         )
     )
+    if not enqueued:
+        # the same update delivered again concurrently, its job edits
+        # its own status message
+        await status_message.delete()
+        return
     await manager.done()
 
 
 containers_dialog = Dialog(
     Window(
         Emojize(_(":package: <b>Доступные контейнеры</b>")),
-        ScrollingGroup(
-            Select(
-                Case(
-                    {
-                        True: Emojize(Format("{item.name} :gear:")),
-                        False: Format("{item.name}"),
-                    },
-                    selector=F["item"].owner.id
-                    == F["event_from_user"].id,  # todo: gear for is_owner
-                ),
-                id="s_containers",
-                item_id_getter=operator.attrgetter("id"),
-                items="containers",
-                on_click=open_container,
+        PaginatedSelect(
+            Case(
+                {
+                    True: Emojize(Format("{item.name} :gear:")),
+                    False: Format("{item.name}"),
+                },
+                selector=F["item"].owner_id
+                == F["event_from_user"].id,  # todo: gear for is_owner
             ),
-            id="scroll_containers",
-            width=1,
+            id="s_containers",
+            query=containers_query,
+            on_click=open_container,
             height=10,
             hide_on_single_page=True,
         ),
         BACK,
         state=ContainersSG.intro,
-        getter=containers_getter,
         preview_add_transitions=[Next()],
     ),
     Window(
@@ -204,7 +192,9 @@ containers_dialog = Dialog(
             Emojize(_(":heavy_plus_sign: Загрузить решение")),
             "add_homework",
             state=ContainersSG.add_homework,
-            when=~F["container"].is_archived & ~F["homework_sent"],
+            when=~F["container"].is_archived
+            & ~F["homework_sent"]
+            & ~F["homework_processing"],
         ),
         StartWithSameData(
             Emojize(_(":mailbox_with_mail: Решения")),
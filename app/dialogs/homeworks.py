@@ -1,12 +1,5 @@
-import asyncio
-import contextlib
-import io
 import logging
-import operator
-import tempfile
-import zipfile
 from datetime import timedelta
-from pathlib import Path
 from typing import Any
 
 from aiogram import Bot, types
@@ -15,36 +8,35 @@ from aiogram.types import BufferedInputFile
 from aiogram_dialog import Dialog, DialogManager, ShowMode, Window
 from aiogram_dialog.api.entities import MediaAttachment, MediaId
 from aiogram_dialog.widgets.input import MessageInput
-from aiogram_dialog.widgets.kbd import (
-    Button,
-    Next,
-    ScrollingGroup,
-    Select,
-)
+from aiogram_dialog.widgets.kbd import Button, Next
 from aiogram_dialog.widgets.media import DynamicMedia
 from aiogram_dialog.widgets.text import Format, Jinja
 from aiogram_dialog.widgets.widget_event import ensure_event_processor
-from openpyxl import Workbook
-from openpyxl.styles import Font
-
-from app.misc import BACK, get_client
-from app.models import Container, Homework
+from tortoise.expressions import Subquery
+from tortoise.functions import Count
+from tortoise.queryset import QuerySet
+
+from app import config
+from app.cache import drop_request_cache, request_cached
+from app.misc import BACK
+from app.models import Container, ExportKind, Homework
+from app.services.export import (
+    build_grades_table,
+    get_artifact,
+    save_artifact,
+    send_homeworks_archive,
+)
 from app.states import HomeworksSG
 from app.utils import lazy_gettext as _
-from app.widgets import Emojize, StartWithSameData
+from app.widgets import Emojize, PaginatedSelect, StartWithSameData
 
 logger = logging.getLogger(__name__)
 
 
-async def homeworks_getter(dialog_manager: DialogManager, **__: Any) -> dict[str, Any]:
-    container_id = dialog_manager.start_data["container_id"]
-    container = await Container.get(id=container_id).prefetch_related("owner")
-    return {
-        "container": container,
-        "homeworks": await Homework.filter(container=container).prefetch_related(
-            "owner"
-        ),
-    }
+def homeworks_query(__: dict, manager: DialogManager) -> QuerySet[Homework]:
+    return Homework.filter(
+        container_id=manager.start_data["container_id"]
+    ).select_related("owner")
 
 
 async def open_homework(
@@ -55,62 +47,66 @@ async def open_homework(
     )
 
 
+@request_cached
+async def get_homework_view(__: DialogManager, homework_id: int) -> Homework:
+    """
+    Loads homework together with the first ID and the number of other
+    homework with the same content in its container.
+    """
+    this = Homework.filter(id=homework_id)
+    twins = Homework.filter(
+        container_id__in=Subquery(this.values("container_id")),
+        content_key__in=Subquery(this.values("content_key")),
+    ).exclude(id=homework_id)
+    return await (
+        Homework.filter(id=homework_id)
+        .select_related("owner", "container")
+        .annotate(
+            twin_id=Subquery(twins.order_by("id").limit(1).values("id")),
+            twin_count=Subquery(twins.annotate(count=Count("id")).values("count")),
+        )
+        .get()
+    )
+
+
 async def homework_view_getter(
     dialog_manager: DialogManager, **__: Any
 ) -> dict[str, Any]:
-    container_id = dialog_manager.start_data["container_id"]
-    container = await Container.get(id=container_id).prefetch_related("owner")
     homework_id = dialog_manager.start_data["homework_id"]
-    homework = await Homework.get(id=homework_id).prefetch_related("owner", "container")
+    homework = await get_homework_view(dialog_manager, homework_id)
 
     created_at = (homework.created_at + timedelta(hours=3)).strftime(
         "%d.%m.%Y %H:%M:%S UTC+3"
     )
+    twins = ""
+    if homework.twin_id is not None:
+        twins = str(homework.twin_id)
+        if homework.twin_count > 1:
+            twins += f" (+{homework.twin_count - 1})"
 
     return {
-        "container": container,
+        "container": homework.container,
         "homework": homework,
         "created_at": created_at,
         "media": MediaAttachment(
             ContentType.DOCUMENT, file_id=MediaId(file_id=homework.file_id)
         ),
         "has_no_mark": homework.mark is None,
+        "twins": twins,
     }
 
 
 async def download_homework_all(
     call: types.CallbackQuery, __: Button, manager: DialogManager
 ) -> None:
-    container_id = manager.start_data["container_id"]
-    homeworks = await Homework.filter(container_id=container_id)
+    container = await Container.get(id=manager.start_data["container_id"])
     bot: Bot = manager.middleware_data["bot"]
 
     await call.answer(
         _("Выгружаем решения. Это займёт некоторое время"), show_alert=True
     )
 
-    zipio = io.BytesIO()
-
-    with tempfile.TemporaryDirectory() as tmpdir:
-        await asyncio.wait(
-            [
-                asyncio.create_task(
-                    bot.download(
-                        homework.file_id, f"{tmpdir}/{homework.id:04d}-{homework.name}"
-                    )
-                )
-                for homework in homeworks
-            ]
-        )
-
-        with zipfile.ZipFile(zipio, "w") as zipf:
-            for file in Path(tmpdir).glob("*"):
-                zipf.write(file, file.name)
-
-    zipio.seek(0)
-    zipio.name = f"container_{container_id}_files.zip"
-    await get_client().send_document(chat_id=call.from_user.id, document=zipio)
-
+    await send_homeworks_archive(bot, container, call.from_user.id)
     await manager.show(ShowMode.SEND)
 
 
@@ -138,6 +134,8 @@ async def add_mark_handler(
 
     homework_id = manager.start_data["homework_id"]
     await Homework.filter(id=homework_id).update(mark=int(mark))
+    await Container.bump_version(manager.start_data["container_id"])
+    drop_request_cache(manager)
     await manager.done()
 
 
@@ -148,6 +146,8 @@ async def add_empty_mark(
 ) -> None:
     homework_id = manager.start_data["homework_id"]
     await Homework.filter(id=homework_id).update(mark=-1)
+    await Container.bump_version(manager.start_data["container_id"])
+    drop_request_cache(manager)
     await manager.done()
 
 
@@ -156,63 +156,40 @@ async def download_table(
 ) -> None:
     container_id = manager.start_data["container_id"]
     container = await Container.get(id=container_id)
-    homeworks = await Homework.filter(container=container).prefetch_related("owner")
-
-    wb = Workbook()
-    ws = wb.active
-
-    headers = [
-        _("ID"),
-        _("Время отправки"),
-        _("ФИО"),
-        _("Имя файла"),
-        _("Оценка"),
-    ]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col)
-        cell.value = str(header)
-        cell.font = Font(bold=True)
-
-    for row, homework in enumerate(homeworks, 2):
-        submitted_at = (homework.created_at + timedelta(hours=3)).strftime(
-            "%d.%m.%Y %H:%M:%S"
-        )
-        grade = (
-            _("Незачёт")
-            if homework.mark == -1
-            else str(homework.mark)
-            if homework.mark is not None
-            else ""
-        )
-        row_data = [
-            homework.id,
-            submitted_at,
-            homework.owner.fio,
-            homework.name,
-            str(grade),
-        ]
-
-        for col, value in enumerate(row_data, 1):
-            ws.cell(row=row, column=col, value=value)
-
-    # adjust column widths
-    for column_iter in ws.columns:
-        column = list(column_iter)
-        max_length = 0
-        for cell in column:
-            with contextlib.suppress(Exception):
-                max_length = max(max_length, len(str(cell.value)))
-        ws.column_dimensions[column[0].column_letter].width = max_length + 2
-
-    excel_file = io.BytesIO()
-    wb.save(excel_file)
-
-    await call.message.answer_document(
+    lang_code = manager.middleware_data["i18n"].current_locale
+    kind = (
+        ExportKind.TABLE_CSV
+        if config.EXPORT_TABLE_FORMAT == "csv"
+        else ExportKind.TABLE
+    )
+
+    artifact = await get_artifact(container, kind, lang_code)
+    if artifact and artifact.version == container.version:
+        await call.message.answer_document(artifact.file_id)
+        await manager.show(ShowMode.SEND)
+        return
+
+    table = await build_grades_table(
+        container,
+        [
+            str(_("ID")),
+            str(_("Время отправки")),
+            str(_("ФИО")),
+            str(_("Имя файла")),
+            str(_("Оценка")),
+        ],
+        str(_("Незачёт")),
+        config.EXPORT_TABLE_FORMAT,
+    )
+    sent = await call.message.answer_document(
         BufferedInputFile(
-            file=excel_file.getvalue(),
-            filename=f"container_{container.id}_grades.xlsx",
+            file=table,
+            filename=f"container_{container.id}_grades.{config.EXPORT_TABLE_FORMAT}",
         ),
     )
+    await save_artifact(
+        container, kind, container.version, sent.document.file_id, lang_code
+    )
     await manager.show(ShowMode.SEND)
 
 
@@ -229,22 +206,16 @@ homeworks_dialog = Dialog(
             "download_table",
             download_table,
         ),
-        ScrollingGroup(
-            Select(
-                Format("{item.owner.fio}"),
-                id="s_homeworks",
-                item_id_getter=operator.attrgetter("id"),
-                items="homeworks",
-                on_click=open_homework,
-            ),
-            id="scroll_homeworks",
-            width=1,
+        PaginatedSelect(
+            Format("{item.owner.fio}"),
+            id="s_homeworks",
+            query=homeworks_query,
+            on_click=open_homework,
             height=10,
             hide_on_single_page=True,
         ),
         BACK,
         state=HomeworksSG.intro,
-        getter=homeworks_getter,
         preview_add_transitions=[Next()],
     ),
     Window(
@@ -266,6 +237,10 @@ homeworks_dialog = Dialog(
 """)
             )
         ),
+        Emojize(
+            Format(_(":warning: Такое же решение отправлено под ID {twins}")),
+            when="twins",
+        ),
         DynamicMedia("media"),
         # Button(
         #     Emojize(_(":inbox_tray: Скачать")),
@@ -9,6 +9,7 @@ from aiogram_dialog.widgets.kbd import Next
 from aiogram_dialog.widgets.text import Const
 
 from app.misc import HOME
+from app.services.user_cache import user_cache
 from app.states import RegisterSG
 from app.utils import lazy_gettext as _
 from app.utils import maybe_next
@@ -30,7 +31,9 @@ async def save_fio(
         return
 
     user = manager.middleware_data["user"]
-    await user.update_from_dict({"fio": fio.title()}).save()
+    user.fio = fio.title()
+    await user.save(update_fields=["fio"])
+    await user_cache.invalidate(user.id)
 
     await maybe_next(manager)
 
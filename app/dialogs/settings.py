@@ -12,6 +12,7 @@ from aiogram_dialog.widgets.widget_event import SimpleEventProcessor
 from app.config import DEFAULT_LOCALE, LOCALES
 from app.misc import BACK, dp
 from app.models import User
+from app.services.user_cache import user_cache
 from app.states import SettingsSG
 from app.utils import lazy_gettext as _
 from app.widgets import Emojize
@@ -50,7 +51,8 @@ async def set_lang_code(
 ) -> None:
     user: User = dialog_manager.middleware_data["user"]
     user.lang_code = lang_code
-    await user.save()
+    await user.save(update_fields=["lang_code"])
+    await user_cache.invalidate(user.id)
 
     i18n = dialog_manager.middleware_data["i18n"]
     i18n.current_locale = lang_code
@@ -17,7 +17,9 @@ from emoji import emojize
 from app import config
 from app.config import LOCALES
 from app.misc import dp
-from app.models import Container, User
+from app.models import User
+from app.services.invites import find_container, join_container
+from app.services.user_cache import user_cache
 from app.states import (
     ContainerCreateSG,
     ContainersSG,
@@ -38,7 +40,8 @@ async def start_cmd(
 ) -> None:
     if user.lang_code is None:
         user.lang_code = parse_ietf_tag(message.from_user.language_code)
-        await user.save()
+        await user.save(update_fields=["lang_code"])
+        await user_cache.invalidate(user.id)
 
         logger.debug("Language for user %d has been set to %s", user.id, user.lang_code)
 
@@ -66,23 +69,20 @@ async def start_cmd(
 
     if message.text.startswith("/start cjoin_"):
         code = message.text[len("/start cjoin_") :]
-        container = await Container.get_or_none(invite_code=code).prefetch_related(
-            "owner", "participants"
-        )
+        container = await find_container(code)
 
         if container:
-            if user in [container.owner, *container.participants]:
-                await message.answer(
-                    _("Ты уже находишься в этом контейнере."), parse_mode=None
-                )
-            else:
+            if await join_container(container, user):
                 await message.answer(
                     _("Ты присоединился к контейнеру {container.name}!").format(
                         container=container
                     ),
                     parse_mode=None,
                 )
-                await container.participants.add(user)
+            else:
+                await message.answer(
+                    _("Ты уже находишься в этом контейнере."), parse_mode=None
+                )
 
             await dialog_manager.start(
                 ContainersSG.view,
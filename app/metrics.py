@@ -0,0 +1,214 @@
+"""
+Prometheus metrics of the process, in the text exposition format.
+
+Updates are timed by MetricsMiddleware, calls to the database, Telegram and
+Yandex GPT are timed where they are made. Each process keeps its own numbers
+and exposes them at /metrics of a separate server when METRICS_PORT is set,
+never on the public webhook server.
+"""
+
+import contextvars
+import functools
+from collections.abc import Awaitable, Callable, Iterator
+from typing import Any, ParamSpec, TypeVar
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import GetUpdates, Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiohttp import web
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+from tortoise import connections
+
+from app.cache import LRUCache
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+)  # fmt: skip
+DB_METHODS = (
+    "execute_insert",
+    "execute_many",
+    "execute_query",
+    "execute_query_dict",
+    "execute_script",
+)
+SQL_OPERATIONS = {"select", "insert", "update", "delete"}
+
+
+class CacheStats(Collector):
+    """
+    Exposes stats() of LRU caches, read at the moment of scraping.
+    """
+
+    def __init__(self, name: str, caches: dict[str, LRUCache]) -> None:
+        self.name = name
+        self.caches = caches
+
+    def collect(self) -> Iterator[Metric]:
+        entries = GaugeMetricFamily(
+            f"{self.name}_entries", "Entries in in-process caches", labels=["cache"]
+        )
+        for name, cache in self.caches.items():
+            entries.add_metric([name], len(cache))
+        yield entries
+
+        for field in ("hits", "misses"):
+            counter = CounterMetricFamily(
+                f"{self.name}_{field}",
+                f"Lookups with {field} in caches",
+                labels=["cache"],
+            )
+            for name, cache in self.caches.items():
+                counter.add_metric([name], getattr(cache, field))
+            yield counter
+
+
+# Metrics of the bot only, without those of the Python process
+registry = CollectorRegistry(auto_describe=True)
+
+UPDATE_LATENCY = Histogram(
+    "edulink_update_seconds",
+    "Time of handling an update",
+    ("update_type", "state", "handler"),
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+UPDATE_ERRORS = Counter(
+    "edulink_update_errors",
+    "Updates whose handler raised an exception",
+    ("update_type", "state", "handler", "error"),
+    registry=registry,
+)
+DEPENDENCY_LATENCY = Histogram(
+    "edulink_dependency_seconds",
+    "Time of calls to the database, Telegram and Yandex GPT",
+    ("dependency", "operation"),
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+BUFFERED_BYTES = Gauge(
+    "edulink_buffered_bytes",
+    "Bytes of downloaded files held by the process, in memory or spooled to disk",
+    registry=registry,
+)
+HOMEWORK_JOB_LATENCY = Histogram(
+    "edulink_homework_job_seconds",
+    "Time of a homework processing attempt, by result: done, retry, failed, "
+    "expired or cancelled",
+    ("result",),
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+
+
+def timed(
+    dependency: str, operation: str
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+    """
+    Decorator that observes time of an async function in DEPENDENCY_LATENCY.
+    """
+
+    def decorator(func: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            with DEPENDENCY_LATENCY.labels(dependency, operation).time():
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class RequestMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Times Bot API requests of the bot, by method, except long polling.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if isinstance(method, GetUpdates):
+            # long polling waits for updates, its time means nothing
+            return await make_request(bot, method)
+        with DEPENDENCY_LATENCY.labels("telegram", method.__api_method__).time():
+            return await make_request(bot, method)
+
+
+# set while a query is timed, so that clients calling each other count once
+_db_timer_active = contextvars.ContextVar("db_timer_active", default=False)
+
+
+def _sql_operation(query: str) -> str:
+    operation = query.lstrip().split(maxsplit=1)[0].lower() if query.strip() else ""
+    return operation if operation in SQL_OPERATIONS else "other"
+
+
+def _timed_db_method(
+    method: Callable[..., Awaitable[T]],
+) -> Callable[..., Awaitable[T]]:
+    @functools.wraps(method)
+    async def wrapper(self: Any, query: str, *args: Any, **kwargs: Any) -> T:
+        if _db_timer_active.get():
+            return await method(self, query, *args, **kwargs)
+
+        token = _db_timer_active.set(True)
+        try:
+            with DEPENDENCY_LATENCY.labels("db", _sql_operation(query)).time():
+                return await method(self, query, *args, **kwargs)
+        finally:
+            _db_timer_active.reset(token)
+
+    wrapper.__metrics_timed__ = True
+    return wrapper
+
+
+def instrument_db() -> None:
+    """
+    Times queries of all Tortoise connections. Call after Tortoise.init().
+    Transaction clients are subclasses of connection clients, they are
+    patched as well, parents first.
+    """
+    classes = [type(connection) for connection in connections.all()]
+    while classes:
+        cls = classes.pop()
+        classes.extend(cls.__subclasses__())
+        for name in DB_METHODS:
+            method = getattr(cls, name)
+            if not hasattr(method, "__metrics_timed__"):
+                setattr(cls, name, _timed_db_method(method))
+
+
+async def metrics_handler(__: web.Request) -> web.Response:
+    return web.Response(
+        body=generate_latest(registry), headers={"Content-Type": CONTENT_TYPE_LATEST}
+    )
+
+
+async def start_server(host: str, port: int) -> web.AppRunner:
+    """
+    Serves /metrics on a separate port, not exposed to Telegram.
+    """
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -4,5 +4,6 @@ Common middlewares.
 
 from app.middlewares.acl import ACLMiddleware
 from app.middlewares.i18n import DatabaseI18nMiddleware
+from app.middlewares.metrics import MetricsMiddleware
 
-__all__ = ["ACLMiddleware", "DatabaseI18nMiddleware"]
+__all__ = ["ACLMiddleware", "DatabaseI18nMiddleware", "MetricsMiddleware"]
@@ -6,6 +6,7 @@ from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 
 from app.models.user import User
+from app.services.user_cache import user_cache
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +14,7 @@ logger = logging.getLogger(__name__)
 class ACLMiddleware(BaseMiddleware):
     """
     Adds a User object to middleware data, creating DB record if user is not found.
+    Users are looked up through user_cache.
     """
 
     async def __call__(
@@ -22,10 +24,11 @@ class ACLMiddleware(BaseMiddleware):
         data: dict[str, Any],
     ) -> Any:
         if (event_user := data.get("event_from_user")) and "user" not in data:
-            user = await User.get_or_none(id=event_user.id)
+            user = await user_cache.get(event_user.id)
             if user is None:
                 user = await User.create(id=event_user.id)
                 logger.info(f"Created new user: {user} from {event}")
+                await user_cache.set(user)
             data["user"] = user
 
         return await handler(event, data)
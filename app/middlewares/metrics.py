@@ -0,0 +1,84 @@
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject, Update
+from aiogram_dialog import Dialog
+from aiogram_dialog.utils import remove_intent_id
+
+from app.metrics import UPDATE_ERRORS, UPDATE_LATENCY
+
+LABELS_KEY = "metrics_labels"
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that records handling time and errors of updates.
+
+    Dialog state and handler are known only after routing, so label_handler()
+    must be registered as inner middleware of message and callback_query
+    observers. It fills labels shared through middleware data. For dialogs the
+    handler is the pressed widget ID, as all of them go through Dialog methods.
+    Callback data comes from the client, so IDs of widgets the dialog doesn't
+    have are replaced with "unknown" to keep the number of series bounded.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        labels = data[LABELS_KEY] = {
+            "update_type": event.event_type,
+            "state": "",
+            "handler": "",
+        }
+        started_at = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            labels.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            UPDATE_LATENCY.labels(
+                labels["update_type"], labels["state"], labels["handler"]
+            ).observe(time.perf_counter() - started_at)
+            if "error" in labels:
+                UPDATE_ERRORS.labels(**labels).inc()
+
+    @staticmethod
+    async def label_handler(
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        labels = data.get(LABELS_KEY)
+        if labels is None:
+            return await handler(event, data)
+
+        if context := data.get("aiogd_context"):
+            labels["state"] = context.state.state
+        elif raw_state := data.get("raw_state"):
+            labels["state"] = raw_state
+
+        callback = data["handler"].callback
+        dialog = getattr(callback, "__self__", None)
+        if not isinstance(dialog, Dialog):
+            labels["handler"] = callback.__qualname__
+        elif isinstance(event, CallbackQuery) and event.data:
+            __, widget_data = remove_intent_id(event.data)
+            widget_id = widget_data.split(":", maxsplit=1)[0]
+            labels["handler"] = (
+                widget_id if dialog.find(widget_id) is not None else "unknown"
+            )
+        else:
+            labels["handler"] = "input"
+
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            # errors handled by routers never reach the outer middleware
+            labels["error"] = type(e).__name__
+            raise
@@ -1,5 +1,7 @@
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.base import DefaultKeyBuilder
 from aiogram.fsm.storage.memory import MemoryStorage
@@ -9,18 +11,24 @@ from aiogram_dialog import StartMode
 from aiogram_dialog.widgets.kbd import Back, Cancel, Start
 from aiogram_dialog.widgets.text import Const
 from pyrogram import Client
+from redis.asyncio import Redis
 
-from app.config import BOT_TOKEN, DEFAULT_LOCALE, REDIS_URL
+from app.config import BOT_TOKEN, DEFAULT_LOCALE, REDIS_URL, TELEGRAM_API_URL
 from app.states import MainSG
 from app.utils import lazy_gettext as _
 from app.widgets import Emojize
 
-bot = Bot(BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+bot = Bot(
+    BOT_TOKEN,
+    session=AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL))
+    if TELEGRAM_API_URL
+    else None,
+    default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+)
+redis = Redis.from_url(REDIS_URL) if REDIS_URL else None
 dp = Dispatcher(
-    storage=RedisStorage.from_url(
-        REDIS_URL, key_builder=DefaultKeyBuilder(with_destiny=True)
-    )
-    if REDIS_URL
+    storage=RedisStorage(redis, key_builder=DefaultKeyBuilder(with_destiny=True))
+    if redis
     else MemoryStorage()
 )
 _client: Client | None = None
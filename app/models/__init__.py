@@ -7,7 +7,21 @@ See https://github.com/tortoise/aerich/issues/129.
 """
 
 from app.models.container import Container
+from app.models.export_artifact import ExportArtifact, ExportKind
 from app.models.homework import Homework
+from app.models.homework_job import HomeworkJob, JobStatus
+from app.models.summary import Summary
+from app.models.uploaded_content import UploadedContent
 from app.models.user import User
 
-__all__ = ["Container", "Homework", "User"]
+__all__ = [
+    "Container",
+    "ExportArtifact",
+    "ExportKind",
+    "Homework",
+    "HomeworkJob",
+    "JobStatus",
+    "Summary",
+    "UploadedContent",
+    "User",
+]
@@ -1,17 +1,24 @@
 import random
+import re
 import string
 
+from pypika_tortoise import Table
 from tortoise import Model, fields
+from tortoise.expressions import F
+
+INVITE_CODE_ALPHABET = string.ascii_letters + string.digits
+INVITE_CODE_LENGTH = 10
+INVITE_CODE_RE = re.compile(f"[{INVITE_CODE_ALPHABET}]{{{INVITE_CODE_LENGTH}}}")
 
 
 def rnd_id() -> str:
-    return "".join(random.choices(string.ascii_letters + string.digits, k=10))
+    return "".join(random.choices(INVITE_CODE_ALPHABET, k=INVITE_CODE_LENGTH))
 
 
 class Container(Model):
     id = fields.IntField(primary_key=True)
     created_at = fields.DatetimeField(auto_now_add=True)
-    invite_code = fields.TextField(default=rnd_id)
+    invite_code = fields.CharField(max_length=16, unique=True, default=rnd_id)
     owner = fields.ForeignKeyField("models.User", related_name="containers_owner")
     name = fields.TextField()
     is_archived = fields.BooleanField(default=False)
@@ -20,3 +27,35 @@ class Container(Model):
     participants = fields.ManyToManyField(
         "models.User", related_name="container_participants"
     )
+    # Incremented on every change of homeworks, see ExportArtifact
+    version = fields.IntField(default=0)
+
+    class Meta:
+        indexes = (("owner", "name"),)
+
+    @classmethod
+    async def bump_version(cls, container_id: int) -> None:
+        """
+        Marks exported files of the container as outdated.
+        """
+        await cls.filter(id=container_id).update(version=F("version") + 1)
+
+    @classmethod
+    async def add_participant(cls, container_id: int, user_id: int) -> bool:
+        """
+        Adds user to participants in a single INSERT, doing nothing if the user
+        is already there.
+        :return: True if the user has been added
+        """
+        field = cls._meta.fields_map["participants"]
+        db = cls._meta.db
+        query = (
+            db.query_class.into(Table(field.through))
+            .columns(field.backward_key, field.forward_key)
+            .insert(container_id, user_id)
+            .on_conflict()
+            .do_nothing()
+            .returning(field.forward_key)
+        )
+        __, rows = await db.execute_query(*query.get_parameterized_sql())
+        return bool(rows)
@@ -0,0 +1,30 @@
+from enum import StrEnum
+
+from tortoise import Model, fields
+
+
+class ExportKind(StrEnum):
+    FILES = "files"
+    TABLE = "table"
+    TABLE_CSV = "table_csv"
+
+
+class ExportArtifact(Model):
+    """
+    The latest exported file of a container, already uploaded to Telegram.
+    It can be sent again by file_id while version equals Container.version.
+    """
+
+    id = fields.IntField(primary_key=True)
+    created_at = fields.DatetimeField(auto_now=True)
+    container = fields.ForeignKeyField("models.Container")
+    kind = fields.CharEnumField(ExportKind)
+    # Exported tables are translated, archives are the same for everyone
+    lang_code = fields.CharField(max_length=2, default="")
+    version = fields.IntField()
+    file_id = fields.TextField()
+    # IDs of homeworks in the archive, new ones can be appended to it
+    homework_ids = fields.JSONField(default=list)
+
+    class Meta:
+        unique_together = (("container", "kind", "lang_code"),)
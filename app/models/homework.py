@@ -6,7 +6,17 @@ class Homework(Model):
     created_at = fields.DatetimeField(auto_now_add=True)
     owner = fields.ForeignKeyField("models.User")
     container = fields.ForeignKeyField("models.Container")
+    # File name in exports, files sent by file_id keep the name they were uploaded with
     name = fields.TextField()
     text = fields.TextField(null=True)
     file_id = fields.TextField()
+    file_unique_id = fields.CharField(max_length=64, null=True)
+    # "file:<file_unique_id of the submitted file>" or "text:<SHA-256 of text>",
+    # equal for identical submissions
+    content_key = fields.CharField(max_length=80, null=True)
     mark = fields.IntField(null=True)
+
+    class Meta:
+        # one submission per student
+        unique_together = (("container", "owner"),)
+        indexes = (("container", "content_key"),)
@@ -0,0 +1,42 @@
+from enum import StrEnum
+
+from tortoise import Model, fields
+
+
+class JobStatus(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class HomeworkJob(Model):
+    """
+    Submitted homework, processed into Homework by app/services/homework_jobs.py.
+    """
+
+    id = fields.IntField(primary_key=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    owner = fields.ForeignKeyField("models.User")
+    container = fields.ForeignKeyField("models.Container")
+    # The submitted message, one job per message
+    chat_id = fields.BigIntField()
+    message_id = fields.IntField()
+    # "Processing..." message edited when the job finishes
+    status_message_id = fields.IntField(null=True)
+    text = fields.TextField(null=True)
+    file_id = fields.TextField(null=True)
+    file_unique_id = fields.CharField(max_length=64, null=True)
+    file_name = fields.TextField(default="")
+    file_ext = fields.TextField()
+
+    status = fields.CharEnumField(JobStatus, default=JobStatus.PENDING)
+    attempts = fields.IntField(default=0)
+    # Pending jobs wait until this time, running ones are taken over after it
+    run_at = fields.DatetimeField()
+    error = fields.TextField(null=True)
+    homework = fields.ForeignKeyField("models.Homework", null=True)
+
+    class Meta:
+        unique_together = (("chat_id", "message_id"),)
+        indexes = (("status", "run_at"),)
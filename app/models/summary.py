@@ -0,0 +1,12 @@
+from tortoise import Model, fields
+
+
+class Summary(Model):
+    """
+    GPT summary of a homework text, keyed by SHA-256 of the normalized text.
+    """
+
+    digest = fields.CharField(max_length=64, primary_key=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    used_at = fields.DatetimeField(auto_now_add=True, index=True)
+    summary = fields.TextField()
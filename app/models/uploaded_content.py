@@ -0,0 +1,15 @@
+from tortoise import Model, fields
+
+
+class UploadedContent(Model):
+    """
+    Named upload of a submitted file or text, keyed by Homework.content_key.
+    The same content is downloaded, summarized and uploaded only once.
+    """
+
+    key = fields.CharField(max_length=80, primary_key=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    file_id = fields.TextField()
+    file_unique_id = fields.CharField(max_length=64)
+    # Part of Homework.name after the student's name and date
+    title = fields.TextField()
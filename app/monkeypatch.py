@@ -3,16 +3,23 @@ Monkeypatching aiogram, aiogram_dialog libraries.
 Aiogram* have bad support for LazyProxy, mostly due to pydantic incompatibility.
 
 The following changes are made:
-1. Get the inner value of LazyProxy when initializing TelegramObject and TelegramMethod.
+1. Get the inner value of LazyProxy when initializing TelegramMethod. Methods
+   are only built for outgoing requests, e.g. message.answer(_("...")), so
+   parsing of incoming updates is not affected. TelegramObject is left as is:
+   texts of keyboards are rendered to str by widgets (see 2).
 2. Cast Union[str, LazyProxy[str]] to str when rendering Text widget.
-3. Cast self.template_text to str when initializing Jinja widget.
+3. Cast self.template_text to str when rendering Jinja widget, and keep compiled
+   templates in jinja_cache, keyed by locale and source.
 """
 
+from collections.abc import Iterable
 from typing import Any
+from weakref import WeakSet
 
 from aiogram.methods.base import TelegramMethod
-from aiogram.types.base import TelegramObject
+from aiogram.utils.i18n import I18n
 from aiogram_dialog import DialogManager
+from aiogram_dialog.widgets.common import WhenCondition
 from aiogram_dialog.widgets.text.base import Text
 from aiogram_dialog.widgets.text.jinja import (
     JINJA_ENV_FIELD,
@@ -20,30 +27,21 @@ from aiogram_dialog.widgets.text.jinja import (
     default_env,
 )
 from babel.support import LazyProxy
+from jinja2 import Environment, Template
+
+from app import config
+from app.cache import LRUCache
 
 
 class CustomTelegramMethod(TelegramMethod):  # noqa
     def __init__(self, /, **kwargs: Any) -> None:
-        if LazyProxy is not None:
-            for key, value in kwargs.items():
-                if isinstance(value, LazyProxy):
-                    kwargs[key] = value.value
+        for key, value in kwargs.items():
+            if isinstance(value, LazyProxy):
+                kwargs[key] = value.value
 
         super(TelegramMethod, self).__init__(**kwargs)
 
 
-class CustomTelegramObject(TelegramObject):
-    def __init__(self, /, **kwargs: Any) -> None:
-        if LazyProxy is not None:
-            for key, value in kwargs.items():
-                if isinstance(value, LazyProxy):
-                    kwargs[key] = value.value
-
-        super(TelegramObject, self).__init__(**kwargs)
-
-
-TelegramObject.__init__ = CustomTelegramObject.__init__
-TelegramObject.__pydantic_base_init__ = True
 TelegramMethod.__init__ = CustomTelegramMethod.__init__
 TelegramMethod.__pydantic_base_init__ = True
 
@@ -58,17 +56,55 @@ async def text_render_text(self: Text, data: dict, manager: DialogManager) -> st
 Text.render_text = text_render_text
 
 
+jinja_cache = LRUCache(config.JINJA_CACHE_SIZE)
+_jinja_widgets: WeakSet[Jinja] = WeakSet()
+_jinja_init = Jinja.__init__
+
+
+def jinja_init(self: Jinja, text: str, when: WhenCondition = None) -> None:
+    _jinja_init(self, text, when)
+    _jinja_widgets.add(self)
+
+
+def get_template(
+    env: Environment, text: str | LazyProxy, *, count: bool = True
+) -> Template:
+    locale = I18n.get_current().current_locale if isinstance(text, LazyProxy) else None
+    source = str(text)  # <<<<< Cast to str
+    key = (env, locale, source)
+    template = jinja_cache.get(key, count=count)
+    if template is None:
+        template = env.from_string(source)
+        jinja_cache.set(key, template)
+    return template
+
+
+def precompile_jinja(i18n: I18n, locales: Iterable[str]) -> int:
+    """
+    Compiles templates of all Jinja widgets for each locale in advance.
+    :return: Number of templates in cache
+    """
+    locales = list(locales)
+    with i18n.context():
+        for widget in list(_jinja_widgets):
+            for locale in locales:
+                with i18n.use_locale(locale):
+                    get_template(default_env, widget.template_text, count=False)
+    return len(jinja_cache)
+
+
 async def jinja_render_text(self: Jinja, data: dict, manager: DialogManager) -> str:
     if JINJA_ENV_FIELD in manager.middleware_data:
         env = manager.middleware_data[JINJA_ENV_FIELD]
     else:
         bot = manager.middleware_data.get("bot")
         env = getattr(bot, JINJA_ENV_FIELD, default_env)
-    template = env.get_template(str(self.template_text))  # <<<<< Cast to str
+    template = get_template(env, self.template_text)
 
     if env.is_async:
         return await template.render_async(data)
     return template.render(data)
 
 
+Jinja.__init__ = jinja_init
 Jinja._render_text = jinja_render_text
@@ -0,0 +1,93 @@
+"""
+Memory-bounded buffers of files passing through the process.
+
+Files are downloaded into SpooledTemporaryFile, which moves to disk beyond
+BUFFER_SPOOL_MB, and uploaded from it in chunks by SpooledInputFile, without
+copying the whole file. Before downloading, the file size is reserved in a
+process-wide budget of BUFFER_BUDGET_MB, so that a rush of submissions waits
+for memory instead of exhausting it. Copies of the file the caller is going
+to make, e.g. to pass it to the extractor pool, are reserved along with it.
+"""
+
+import asyncio
+import contextlib
+import tempfile
+from collections.abc import AsyncGenerator, AsyncIterator
+from typing import IO
+
+from aiogram import Bot
+from aiogram.types import InputFile
+from aiogram.types.input_file import DEFAULT_CHUNK_SIZE
+
+from app import config
+from app.metrics import BUFFERED_BYTES, DEPENDENCY_LATENCY
+
+
+class ByteBudget:
+    """
+    Async semaphore weighted by bytes. A request larger than the whole
+    budget takes all of it.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.used = 0
+        self._released = asyncio.Condition()
+
+    @contextlib.asynccontextmanager
+    async def reserve(self, size: int) -> AsyncIterator[None]:
+        size = min(size, self.limit)
+        async with self._released:
+            await self._released.wait_for(lambda: self.used + size <= self.limit)
+            self.used += size
+        BUFFERED_BYTES.inc(size)
+        try:
+            yield
+        finally:
+            BUFFERED_BYTES.dec(size)
+            async with self._released:
+                self.used -= size
+                self._released.notify_all()
+
+
+class SpooledInputFile(InputFile):
+    """
+    Uploads contents of a file object, reading it chunk by chunk.
+    """
+
+    def __init__(
+        self, file: IO[bytes], filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> None:
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.file = file
+
+    async def read(self, __: Bot) -> AsyncGenerator[bytes, None]:
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
+
+
+def spooled_file() -> tempfile.SpooledTemporaryFile:
+    return tempfile.SpooledTemporaryFile(max_size=config.BUFFER_SPOOL_MB * 1024 * 1024)
+
+
+@contextlib.asynccontextmanager
+async def downloaded(
+    bot: Bot, file_id: str, copies: int = 0
+) -> AsyncIterator[IO[bytes]]:
+    """
+    Downloads file into a spooled buffer within the byte budget.
+    The buffer is closed and its size released on exit.
+    :param copies: Copies of the file held in memory by the caller,
+        reserved in the budget as well
+    """
+    file = await bot.get_file(file_id)
+    size = file.file_size or config.FILE_SIZE_LIMIT_MB * 1024 * 1024
+    async with byte_budget.reserve(size * (1 + copies)):
+        with spooled_file() as buffer:
+            with DEPENDENCY_LATENCY.labels("telegram", "download").time():
+                await bot.download_file(file.file_path, buffer)
+            yield buffer
+
+
+byte_budget = ByteBudget(config.BUFFER_BUDGET_MB * 1024 * 1024)
@@ -0,0 +1,306 @@
+"""
+Export of submitted homework files into a ZIP archive.
+
+Files are downloaded by a bounded pool of workers and written into the
+archive as soon as they arrive, so at most EXPORT_DOWNLOAD_WORKERS files
+are held in memory at once, no matter how large the container is.
+Compression runs in a thread, in parallel with downloads and the event loop.
+
+Uploaded exports are remembered as ExportArtifact. While the container
+version does not change, they are sent again by file_id; when homeworks
+are added, only the new files are appended to the previous archive.
+"""
+
+import asyncio
+import csv
+import io
+import logging
+import tempfile
+import zipfile
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+from app import config
+from app.metrics import DEPENDENCY_LATENCY
+from app.misc import get_client
+from app.models import Container, ExportArtifact, ExportKind, Homework
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_ATTEMPTS = 3
+# Already compressed formats, deflating them again only wastes CPU
+STORED_EXTENSIONS = {
+    "7z", "docx", "gif", "gz", "jpeg", "jpg", "mp3", "mp4", "odp", "ods", "odt",
+    "pdf", "png", "pptx", "rar", "webp", "xlsx", "zip",
+}  # fmt: skip
+
+
+async def download_file(bot: Bot, file_id: str) -> bytes:
+    """
+    Downloads file into memory, waiting out flood limits.
+    """
+    attempt = 1
+    while True:
+        try:
+            buffer = io.BytesIO()
+            with DEPENDENCY_LATENCY.labels("telegram", "download").time():
+                await bot.download(file_id, buffer)
+            return buffer.getvalue()
+        except TelegramRetryAfter as e:
+            if attempt >= DOWNLOAD_ATTEMPTS:
+                raise
+            attempt += 1
+            logger.warning("Flood limit on download, sleeping %ds", e.retry_after)
+            await asyncio.sleep(e.retry_after)
+
+
+def zip_entry_name(homework: Homework) -> str:
+    return f"{homework.id:04d}-{homework.name}"
+
+
+def _write_entry(zipf: zipfile.ZipFile, name: str, data: bytes) -> None:
+    ext = name.rsplit(".", maxsplit=1)[-1].lower()
+    if ext in STORED_EXTENSIONS:
+        zipf.writestr(name, data, compress_type=zipfile.ZIP_STORED)
+    else:
+        zipf.writestr(
+            name,
+            data,
+            compress_type=zipfile.ZIP_DEFLATED,
+            compresslevel=config.EXPORT_COMPRESSLEVEL,
+        )
+
+
+async def write_homeworks_zip(
+    bot: Bot, homeworks: Iterable[Homework], file: BinaryIO, mode: str = "w"
+) -> list[int]:
+    """
+    Downloads files of the homeworks and writes them into a ZIP archive.
+    Files that can't be downloaded are skipped.
+    :param bot: Bot to download files with
+    :param homeworks: Homeworks to export
+    :param file: Seekable binary file the archive is written to
+    :param mode: "w" to create a new archive, "a" to append to the one in file
+    :return: IDs of homeworks written to the archive
+    """
+    pending = iter(homeworks)
+    queue: asyncio.Queue[tuple[Homework, bytes] | None] = asyncio.Queue(
+        maxsize=config.EXPORT_DOWNLOAD_WORKERS
+    )
+
+    async def download_worker() -> None:
+        for homework in pending:
+            try:
+                data = await download_file(bot, homework.file_id)
+            except Exception:
+                logger.exception("Failed to download homework %d", homework.id)
+                continue
+            await queue.put((homework, data))
+
+    async def download_all() -> None:
+        try:
+            await asyncio.gather(
+                *(download_worker() for __ in range(config.EXPORT_DOWNLOAD_WORKERS))
+            )
+        finally:
+            await queue.put(None)
+
+    written = []
+    downloader = asyncio.create_task(download_all())
+    try:
+        with zipfile.ZipFile(file, mode) as zipf:
+            while (item := await queue.get()) is not None:
+                homework, data = item
+                await asyncio.to_thread(
+                    _write_entry, zipf, zip_entry_name(homework), data
+                )
+                written.append(homework.id)
+    finally:
+        downloader.cancel()
+
+    return written
+
+
+async def get_artifact(
+    container: Container, kind: ExportKind, lang_code: str = ""
+) -> ExportArtifact | None:
+    return await ExportArtifact.get_or_none(
+        container_id=container.id, kind=kind, lang_code=lang_code
+    )
+
+
+async def save_artifact(  # noqa: PLR0913
+    container: Container,
+    kind: ExportKind,
+    version: int,
+    file_id: str,
+    lang_code: str = "",
+    homework_ids: Iterable[int] = (),
+) -> None:
+    """
+    Remembers uploaded export.
+    :param version: Container version read before the export data was queried
+    """
+    await ExportArtifact.update_or_create(
+        {"version": version, "file_id": file_id, "homework_ids": sorted(homework_ids)},
+        container_id=container.id,
+        kind=kind,
+        lang_code=lang_code,
+    )
+
+
+async def send_homeworks_archive(bot: Bot, container: Container, chat_id: int) -> None:
+    """
+    Sends ZIP archive with files of all homeworks of the container,
+    reusing the previously exported archive when possible.
+    """
+    client = get_client()
+    version = container.version
+    artifact = await get_artifact(container, ExportKind.FILES)
+    homeworks = await Homework.filter(container_id=container.id).order_by("id")
+
+    exported = set(artifact.homework_ids) if artifact else set()
+    new_homeworks = [homework for homework in homeworks if homework.id not in exported]
+    if artifact and not new_homeworks:
+        # nothing to add, e.g. only marks have changed
+        try:
+            with DEPENDENCY_LATENCY.labels("pyrogram", "send_document").time():
+                await client.send_document(chat_id, artifact.file_id)
+        except Exception:
+            logger.exception("Failed to resend archive of container %d", container.id)
+        else:
+            if artifact.version != version:
+                await save_artifact(
+                    container,
+                    ExportKind.FILES,
+                    version,
+                    artifact.file_id,
+                    homework_ids=exported,
+                )
+            return
+
+    with tempfile.SpooledTemporaryFile(
+        max_size=config.EXPORT_SPOOL_MB * 1024 * 1024
+    ) as file:
+        mode = "w"
+        if artifact and new_homeworks != homeworks:
+            try:
+                with DEPENDENCY_LATENCY.labels("pyrogram", "stream_media").time():
+                    async for chunk in client.stream_media(artifact.file_id):
+                        file.write(chunk)
+            except Exception:
+                logger.exception(
+                    "Failed to fetch archive of container %d", container.id
+                )
+                file.seek(0)
+                file.truncate()
+                new_homeworks = homeworks
+                exported = set()
+            else:
+                mode = "a"
+
+        written = await write_homeworks_zip(bot, new_homeworks, file, mode)
+        with DEPENDENCY_LATENCY.labels("pyrogram", "send_document").time():
+            sent = await client.send_document(
+                chat_id=chat_id,
+                document=file,
+                file_name=f"container_{container.id}_files.zip",
+            )
+
+    await save_artifact(
+        container,
+        ExportKind.FILES,
+        version,
+        sent.document.file_id,
+        homework_ids=exported.union(written),
+    )
+
+
+def _format_grades(
+    rows: list[tuple[int, datetime, str, str, int | None]], no_credit: str
+) -> tuple[list[list[Any]], list[int]]:
+    """
+    Converts DB rows to table rows, measuring column widths on the way.
+    """
+    table = []
+    widths = [0] * 5
+    for homework_id, created_at, fio, name, mark in rows:
+        submitted_at = (created_at + timedelta(hours=3)).strftime("%d.%m.%Y %H:%M:%S")
+        grade = no_credit if mark == -1 else str(mark) if mark is not None else ""
+        row = [homework_id, submitted_at, fio, name, grade]
+        for col, value in enumerate(row):
+            widths[col] = max(widths[col], len(str(value)))
+        table.append(row)
+    return table, widths
+
+
+def _write_grades_xlsx(
+    headers: list[str], rows: list[list[Any]], widths: list[int]
+) -> bytes:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for col, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(col)].width = width + 2
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = Font(bold=True)
+        header_cells.append(cell)
+    ws.append(header_cells)
+    for row in rows:
+        ws.append(row)
+
+    file = io.BytesIO()
+    wb.save(file)
+    return file.getvalue()
+
+
+def _write_grades_csv(headers: list[str], rows: list[list[Any]]) -> bytes:
+    file = io.StringIO()
+    writer = csv.writer(file)
+    writer.writerow(headers)
+    writer.writerows(rows)
+    # BOM makes Excel detect UTF-8
+    return file.getvalue().encode("utf-8-sig")
+
+
+def _build_grades_table(
+    rows: list[tuple[int, datetime, str, str, int | None]],
+    headers: list[str],
+    no_credit: str,
+    fmt: str,
+) -> bytes:
+    table, widths = _format_grades(rows, no_credit)
+    for col, header in enumerate(headers):
+        widths[col] = max(widths[col], len(header))
+
+    if fmt == "csv":
+        return _write_grades_csv(headers, table)
+    return _write_grades_xlsx(headers, table, widths)
+
+
+async def build_grades_table(
+    container: Container, headers: list[str], no_credit: str, fmt: str
+) -> bytes:
+    """
+    Builds table of homeworks and marks in a worker thread.
+    :param container: Container to export
+    :param headers: Translated column titles: ID, time, name, file name, mark
+    :param no_credit: Translated text for mark -1
+    :param fmt: "xlsx" or "csv"
+    """
+    rows = await (
+        Homework.filter(container_id=container.id)
+        .order_by("id")
+        .values_list("id", "created_at", "owner__fio", "name", "mark")
+    )
+    return await asyncio.to_thread(_build_grades_table, rows, headers, no_credit, fmt)
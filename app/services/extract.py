@@ -0,0 +1,289 @@
+"""
+Text extraction from submitted documents.
+
+Extractors are registered by file extension with @extractor. Each one reads
+the document incrementally and stops once `limit` characters
+(EXTRACT_SYMBOLS_LIMIT) are collected: DOCX and ODT are parsed as streams of
+XML inside the ZIP, notebooks cell by cell, PDF page by page, plain text and
+source files only decode the bytes they need. The part sent to GPT is then
+sampled from the text by app/services/sampling.py.
+
+Parsing is CPU-bound, so it runs in a separate process pool and never blocks
+the event loop. Each job is limited in CPU time and memory: a worker that
+exceeds the CPU limit is killed by the OS, the pool is recreated and the
+job is reported as failed without retries. Other jobs running in the broken
+pool at that moment fail too.
+"""
+
+import asyncio
+import codecs
+import io
+import json
+import logging
+import multiprocessing
+import re
+import resource
+import zipfile
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import IO
+from xml.etree import ElementTree
+
+import PyPDF2
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionError(Exception):
+    pass
+
+
+Extractor = Callable[[bytes, int], str]
+# file extension -> extractor, see extractor()
+EXTRACTORS: dict[str, Extractor] = {}
+
+SOURCE_EXTENSIONS = (
+    "asm", "c", "cc", "cpp", "cs", "css", "csv", "dart", "go", "h", "hpp", "hs",
+    "html", "java", "js", "json", "jl", "kt", "lua", "m", "md", "pas", "php",
+    "pl", "py", "r", "rb", "rs", "scala", "sh", "sql", "swift", "tex", "ts",
+    "txt", "xml", "yaml", "yml",
+)  # fmt: skip
+# Copies of the data held by the process while a job runs in the pool:
+# bytes read from the file and their pickle sent to the worker
+POOL_COPIES = 2
+# Larger archive members are skipped
+ZIP_MEMBER_SIZE_LIMIT = 16 * 1024 * 1024
+
+NOTEBOOK_START_RE = re.compile(r'\s*\{\s*"cells"\s*:\s*\[')
+JSON_SEPARATOR_RE = re.compile(r"[\s,]*")
+
+DOCX_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+ODT_NS = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+
+
+def _init_worker(memory_mb: int) -> None:
+    limit = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _run_job(func: Extractor, data: bytes, limit: int, cpu_seconds: int) -> str:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime)
+    __, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_seconds, hard))
+    return func(data, limit)
+
+
+def extractor(*extensions: str) -> Callable[[Extractor], Extractor]:
+    """
+    Registers function extracting text from files with given extensions.
+    It runs in the pool as func(data, limit) and should stop reading the
+    document as soon as `limit` characters are collected.
+    """
+
+    def decorator(func: Extractor) -> Extractor:
+        for extension in extensions:
+            EXTRACTORS[extension] = func
+        return func
+
+    return decorator
+
+
+def get_extractor(file_ext: str) -> Extractor | None:
+    return EXTRACTORS.get(file_ext.lower())
+
+
+class TextCollector:
+    def __init__(self, limit: int) -> None:
+        self.parts: list[str] = []
+        self.left = limit
+
+    @property
+    def full(self) -> bool:
+        return self.left <= 0
+
+    def add(self, text: str) -> bool:
+        """
+        :return: True if more text is needed
+        """
+        text = text[: self.left]
+        self.parts.append(text)
+        self.left -= len(text)
+        return not self.full
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+@extractor("pdf")
+def extract_pdf(data: bytes, limit: int) -> str:
+    """
+    Extracts text page by page.
+    """
+    collector = TextCollector(limit)
+    for page in PyPDF2.PdfReader(io.BytesIO(data)).pages:
+        if not collector.add(page.extract_text()):
+            break
+    return collector.text()
+
+
+@extractor(*SOURCE_EXTENSIONS)
+def extract_source(data: bytes, limit: int) -> str:
+    """
+    Decodes UTF-8 text, only as many bytes as `limit` characters can take.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    return decoder.decode(data[: limit * 4])[:limit]
+
+
+def _iter_xml_blocks(file: IO[bytes], tags: set[str]) -> Iterator[str]:
+    """
+    Parses XML incrementally, yielding text of elements with given tags.
+    Parsed elements are cleared, so memory use does not grow with the file.
+    """
+    for __, element in ElementTree.iterparse(file, events=("end",)):
+        if element.tag in tags:
+            yield "".join(element.itertext()) + "\n"
+            element.clear()
+
+
+def _extract_xml_member(data: bytes, member: str, tags: set[str], limit: int) -> str:
+    collector = TextCollector(limit)
+    with zipfile.ZipFile(io.BytesIO(data)) as zipf, zipf.open(member) as file:
+        for block in _iter_xml_blocks(file, tags):
+            if not collector.add(block):
+                break
+    return collector.text()
+
+
+@extractor("docx")
+def extract_docx(data: bytes, limit: int) -> str:
+    return _extract_xml_member(data, "word/document.xml", {f"{DOCX_NS}p"}, limit)
+
+
+@extractor("odt")
+def extract_odt(data: bytes, limit: int) -> str:
+    return _extract_xml_member(data, "content.xml", {f"{ODT_NS}p", f"{ODT_NS}h"}, limit)
+
+
+def _iter_notebook_cells(text: str) -> Iterator[dict]:
+    """
+    Decodes cells one by one. Notebooks saved by Jupyter start with them,
+    others are decoded whole.
+    """
+    match = NOTEBOOK_START_RE.match(text)
+    if match is None:
+        yield from json.loads(text).get("cells", [])
+        return
+
+    decoder = json.JSONDecoder()
+    index = match.end()
+    while True:
+        index = JSON_SEPARATOR_RE.match(text, index).end()
+        if text.startswith("]", index):
+            return
+        cell, index = decoder.raw_decode(text, index)
+        yield cell
+
+
+@extractor("ipynb")
+def extract_ipynb(data: bytes, limit: int) -> str:
+    """
+    Extracts sources of code and markdown cells, without outputs.
+    """
+    collector = TextCollector(limit)
+    for cell in _iter_notebook_cells(data.decode("utf-8")):
+        source = cell.get("source", "")
+        if isinstance(source, list):
+            source = "".join(source)
+        if not collector.add(source + "\n\n"):
+            break
+    return collector.text()
+
+
+@extractor("zip")
+def extract_zip(data: bytes, limit: int) -> str:
+    """
+    Extracts text of archive members in supported formats, each after
+    its path. Nested archives are skipped.
+    """
+    collector = TextCollector(limit)
+    with zipfile.ZipFile(io.BytesIO(data)) as zipf:
+        for info in zipf.infolist():
+            file_ext = info.filename.rsplit(".", maxsplit=1)[-1]
+            func = get_extractor(file_ext)
+            if (
+                info.is_dir()
+                or func is None
+                or func is extract_zip
+                or info.file_size > ZIP_MEMBER_SIZE_LIMIT
+            ):
+                continue
+            if not collector.add(info.filename + "\n"):
+                break
+            try:
+                text = func(zipf.read(info), collector.left)
+            except Exception:
+                # a broken member should not spoil the rest
+                continue
+            if not collector.add(text + "\n"):
+                break
+    return collector.text()
+
+
+class ExtractorPool:
+    def __init__(self, workers: int, cpu_seconds: int, memory_mb: int) -> None:
+        self.workers = workers
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.memory_mb,),
+            )
+        return self._executor
+
+    async def run(self, func: Extractor, data: bytes) -> str:
+        """
+        Runs func(data, limit) in the pool. If the pool breaks, e.g. because
+        some job exceeded the CPU limit, it is recreated and the job is not
+        retried: it would most likely break the new pool as well.
+        :raises ExtractionError: Job failed or was killed
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(
+                executor,
+                _run_job,
+                func,
+                data,
+                config.EXTRACT_SYMBOLS_LIMIT,
+                self.cpu_seconds,
+            )
+        except BrokenProcessPool as e:
+            logger.warning("Extractor pool is broken, recreating it")
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise ExtractionError(f"{func.__name__} killed") from e
+        except Exception as e:
+            raise ExtractionError(f"{func.__name__} failed") from e
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+extractor_pool = ExtractorPool(
+    config.EXTRACT_WORKERS, config.EXTRACT_CPU_SECONDS, config.EXTRACT_MEMORY_MB
+)
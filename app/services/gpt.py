@@ -1,26 +1,154 @@
 import asyncio
 import logging
 import re
+import time
+from typing import Any
 
 import aiohttp
 
 from app import config
 from app.config import GPT_SYMBOLS_LIMIT
+from app.metrics import timed
 
 logger = logging.getLogger(__name__)
 
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
+
+class GPTError(RuntimeError):
+    pass
+
+
+class YandexGPTClient:
+    """
+    Long-lived Yandex GPT client sharing one connection pool.
+
+    Not more than `concurrency` completions run at once. Each HTTP request
+    is limited by `timeout` and retried up to `retries` times on network
+    errors, 429 and 5xx. When `use_async_api` is set, the completionAsync
+    endpoint is used and the operation is polled with exponential backoff.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        api_key: str,
+        folder_id: str,
+        *,
+        api_url: str,
+        concurrency: int,
+        timeout: float,
+        retries: int,
+        use_async_api: bool = False,
+        operation_timeout: float = 120,
+    ) -> None:
+        self.api_key = api_key
+        self.folder_id = folder_id
+        self.api_url = api_url
+        self.timeout = timeout
+        self.retries = retries
+        self.use_async_api = use_async_api
+        self.operation_timeout = operation_timeout
+        self._concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session: aiohttp.ClientSession | None = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                base_url=self.api_url,
+                headers={"Authorization": f"Api-Key {self.api_key}"},
+                connector=aiohttp.TCPConnector(
+                    limit=self._concurrency, keepalive_timeout=60
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> dict[str, Any]:
+        session = self._get_session()
+        attempt = 0
+        while True:
+            try:
+                async with session.request(method, url, **kwargs) as resp:
+                    if resp.status not in RETRY_STATUSES:
+                        resp.raise_for_status()
+                        return await resp.json()
+                    error: Exception = GPTError(f"{method} {url}: HTTP {resp.status}")
+            except (aiohttp.ClientConnectionError, TimeoutError) as e:
+                error = e
+
+            if attempt >= self.retries:
+                raise error
+            delay = 0.5 * 2**attempt
+            attempt += 1
+            logger.warning("GPT request failed (%s), retrying in %.1fs", error, delay)
+            await asyncio.sleep(delay)
+
+    async def _wait_operation(self, operation_id: str) -> dict[str, Any]:
+        deadline = time.monotonic() + self.operation_timeout
+        delay = 0.25
+        while time.monotonic() < deadline:
+            response = await self._request("GET", f"/operations/{operation_id}")
+            if response["done"]:
+                return response["response"]
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.5, 2)
+
+        raise GPTError(f"timeout waiting for response for operation {operation_id}")
+
+    async def complete(self, messages: list[dict[str, str]], model: str) -> str:
+        """
+        Runs a completion.
+        :param messages: Messages with "role" and "text" keys
+        :param model: Model name, e.g. yandexgpt-lite
+        :return: Text of the first alternative
+        """
+        body = {
+            "modelUri": f"gpt://{self.folder_id}/{model}",
+            "completionOptions": {"stream": False, "temperature": 0, "maxTokens": 4000},
+            "messages": messages,
+        }
+
+        async with self._semaphore:
+            if self.use_async_api:
+                operation = await self._request(
+                    "POST", "/foundationModels/v1/completionAsync", json=body
+                )
+                result = await self._wait_operation(operation["id"])
+            else:
+                response = await self._request(
+                    "POST", "/foundationModels/v1/completion", json=body
+                )
+                result = response["result"]
+
+        logger.info("Response from Yandex Cloud: %s", result)
+        return result["alternatives"][0]["message"]["text"]
+
+
+gpt_client = YandexGPTClient(
+    config.YANDEX_API_KEY,
+    config.YANDEX_FOLDER_ID,
+    api_url=config.GPT_API_URL,
+    concurrency=config.GPT_CONCURRENCY,
+    timeout=config.GPT_TIMEOUT,
+    retries=config.GPT_RETRIES,
+    use_async_api=config.GPT_ASYNC_API,
+)
+
+
+@timed("gpt", "summarize")
 async def summarize_homework_text(text: str) -> str:
     if text.strip() == "":
         return ""
     text = text[:GPT_SYMBOLS_LIMIT]
 
-    gpt_model = "yandexgpt-lite"
-
-    body = {
-        "modelUri": f"gpt://{config.YANDEX_FOLDER_ID}/{gpt_model}",
-        "completionOptions": {"stream": False, "temperature": 0, "maxTokens": 4000},
-        "messages": [
+    answer = await gpt_client.complete(
+        [
             {
                 "role": "system",
                 "text": (
@@ -38,32 +166,8 @@ async def summarize_homework_text(text: str) -> str:
             },
             {"role": "user", "text": text},
         ],
-    }
-
-    url = "https://llm.api.cloud.yandex.net/foundationModels/v1/completionAsync"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Api-Key {config.YANDEX_API_KEY}",
-    }
-
-    async with aiohttp.ClientSession(headers=headers) as session:
-        async with session.post(url, json=body) as resp:
-            operation_id = (await resp.json())["id"]
-
-        url = f"https://llm.api.cloud.yandex.net/operations/{operation_id}"
-
-        for _ in range(60):
-            async with session.get(url) as resp:
-                response = await resp.json()
-                if response["done"]:
-                    break
-                await asyncio.sleep(2)
-        else:
-            raise RuntimeError(
-                f"timeout waiting for response for operation {operation_id}"
-            )
+        model="yandexgpt-lite",
+    )
 
-    logger.info("Response from Yandex Cloud: %s", response)
-    answer = response["response"]["alternatives"][0]["message"]["text"]
     joined = " ".join([i.strip() for i in answer.split(",")]).replace(" ", "_")
     return re.sub(r"['\".]", "", joined)
@@ -0,0 +1,405 @@
+"""
+Persistent queue of homework submissions, stored as HomeworkJob rows.
+
+homework_handler only validates the message and enqueues it, so the student
+gets an answer at once. A poller in every bot process claims due jobs from
+the database for idle workers of the process, which download files with a text extractor (see app/services/extract.py),
+name them after a GPT summary, upload them to UPLOAD_FILES_CHAT_ID and create
+Homework, named after the student and the summary. Other files are not
+downloaded, Homework refers to the student's upload. The status message sent
+by the handler is then edited to the result.
+
+Uploads are indexed in UploadedContent by file_unique_id of the submitted
+file or by hash of the text, so a file or text submitted again reuses the
+upload and its title without downloads or GPT calls. Such uploads are named
+after the summary only, as they are shown to teachers of every student who
+submits them.
+
+A job is taken by incrementing its attempts, on condition that nobody has
+done so since it was read, so that processes never run the same attempt
+twice. While running, run_at is the end of the lease: if the process dies,
+another one takes the job over after HOMEWORK_JOB_LEASE seconds. Results of
+an attempt are saved on condition that attempts has not changed, so an
+attempt whose lease has run out neither saves nor reports them. Failed
+attempts are retried with exponential backoff. If GPT keeps failing, the
+last attempt saves the homework without a summary in its name.
+"""
+
+import asyncio
+import contextlib
+import datetime
+import io
+import logging
+import re
+import time
+from collections.abc import AsyncIterator
+from typing import IO, Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from tortoise import timezone
+from tortoise.exceptions import IntegrityError
+from tortoise.transactions import in_transaction
+
+from app import config
+from app.metrics import HOMEWORK_JOB_LATENCY
+from app.misc import i18n
+from app.models import Container, Homework, HomeworkJob, JobStatus, UploadedContent
+from app.services.buffers import SpooledInputFile, downloaded
+from app.services.extract import (
+    POOL_COPIES,
+    ExtractionError,
+    extractor_pool,
+    get_extractor,
+)
+from app.services.summary_cache import summary_cache, text_digest
+from app.utils import get_short_fio
+from app.utils import lazy_gettext as _
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (JobStatus.PENDING, JobStatus.RUNNING)
+
+
+class LeaseExpiredError(Exception):
+    """
+    The job has been taken over by another attempt.
+    """
+
+
+def title_from_file_name(file_name: str) -> str:
+    return re.sub(r"[\s\-]", "_", re.sub(r"[^a-zA-Z0-9\s_\-]", "", file_name))
+
+
+async def get_file_summary(file_ext: str, buffer: IO[bytes]) -> str:
+    """
+    Summarizes text of the file.
+    :return: Empty string if the format is not supported or no text could
+        be extracted
+    """
+    if (func := get_extractor(file_ext)) is None:
+        return ""
+
+    try:
+        text = await extractor_pool.run(func, buffer.read())
+    except ExtractionError:
+        logger.exception("Failed to extract text from .%s file", file_ext)
+        return ""
+    return await summary_cache.summarize(text)
+
+
+def homework_name(job: HomeworkJob, title: str) -> str:
+    return (
+        get_short_fio(job.owner.fio)
+        + "_"
+        + job.created_at.strftime("%d_%m")
+        + title[:30].rstrip("_-")
+        + "."
+        + job.file_ext
+    )
+
+
+@contextlib.asynccontextmanager
+async def job_buffer(bot: Bot, job: HomeworkJob) -> AsyncIterator[IO[bytes]]:
+    if job.file_id is not None:
+        # the file is read whole to be passed to the extractor pool
+        async with downloaded(bot, job.file_id, copies=POOL_COPIES) as buffer:
+            yield buffer
+    else:
+        # texts of messages are at most 4096 characters, not worth budgeting
+        yield io.BytesIO(job.text.encode())
+
+
+def content_name(title: str, file_ext: str) -> str:
+    """
+    Name of an upload shared by students submitting the same content,
+    without any of them in it. Homework.name names the file in exports.
+    """
+    return (title[:30].strip("_-") or "homework") + "." + file_ext
+
+
+def content_key(job: HomeworkJob) -> str:
+    if job.file_unique_id is not None:
+        return f"file:{job.file_unique_id}"
+    return f"text:{text_digest(job.text)}"
+
+
+async def upload_renamed(bot: Bot, job: HomeworkJob, key: str) -> UploadedContent:
+    """
+    Names the file after its summary and uploads it under that name.
+    The upload is indexed by content key if the summary has succeeded,
+    a title made of the file name is not reused for other students.
+    An attempt interrupted after the upload uploads the file again, the
+    copy in UPLOAD_FILES_CHAT_ID is left unused.
+    """
+    async with job_buffer(bot, job) as buffer:
+        try:
+            summary = await get_file_summary(job.file_ext, buffer)
+        except Exception:
+            if job.attempts < config.HOMEWORK_JOB_ATTEMPTS:
+                raise
+            logger.exception("Saving homework of job %d without summary", job.id)
+            summary = ""
+        title = "_" + summary if summary else title_from_file_name(job.file_name)
+
+        sent = await bot.send_document(
+            config.UPLOAD_FILES_CHAT_ID,
+            SpooledInputFile(buffer, filename=content_name(title, job.file_ext)),
+        )
+    uploaded = UploadedContent(
+        key=key,
+        file_id=sent.document.file_id,
+        file_unique_id=sent.document.file_unique_id,
+        title=title,
+    )
+    if summary:
+        # a concurrent upload of the same content may have been saved first
+        await UploadedContent.bulk_create([uploaded], ignore_conflicts=True)
+    return uploaded
+
+
+async def process_job(bot: Bot, job: HomeworkJob) -> Homework | None:
+    """
+    Turns the submission into Homework and marks the job as done.
+    :return: None if the student has submitted another solution meanwhile
+    :raise LeaseExpiredError: If the job has been taken over by another attempt
+    """
+    key = content_key(job)
+    if job.file_id is not None and get_extractor(job.file_ext) is None:
+        # the file is not read, so the original upload is kept.
+        # Its name is applied only to entries of exported archives
+        uploaded = UploadedContent(
+            file_id=job.file_id,
+            file_unique_id=job.file_unique_id,
+            title=title_from_file_name(job.file_name),
+        )
+    elif (uploaded := await UploadedContent.get_or_none(key=key)) is None:
+        uploaded = await upload_renamed(bot, job, key)
+
+    try:
+        # a job is never done without its homework, even if the process dies
+        async with in_transaction():
+            homework = await Homework.create(
+                owner_id=job.owner_id,
+                container_id=job.container_id,
+                text=job.text,
+                file_id=uploaded.file_id,
+                file_unique_id=uploaded.file_unique_id,
+                content_key=key,
+                name=homework_name(job, uploaded.title),
+            )
+            updated = await HomeworkJob.filter(id=job.id, attempts=job.attempts).update(
+                status=JobStatus.DONE, homework_id=homework.id, error=None
+            )
+            if not updated:
+                # rolls back the homework, the current attempt creates it
+                raise LeaseExpiredError(job.id)
+    except IntegrityError:
+        updated = await HomeworkJob.filter(id=job.id, attempts=job.attempts).update(
+            status=JobStatus.DONE, error=None
+        )
+        if not updated:
+            raise LeaseExpiredError(job.id) from None
+        return None
+    await Container.bump_version(homework.container_id)
+    return homework
+
+
+class HomeworkQueue:
+    """
+    Pool of workers processing HomeworkJob rows. Start with start(),
+    stop with stop().
+
+    Only the poller queries the table: it claims as many due jobs as there
+    are idle workers and passes them on through a queue, then sleeps until
+    a job is enqueued, a worker gets idle or HOMEWORK_POLL_INTERVAL passes.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._jobs: asyncio.Queue[HomeworkJob] = asyncio.Queue()
+        # workers waiting for a job
+        self._idle = 0
+
+    async def enqueue(self, job: HomeworkJob) -> bool:
+        """
+        Saves unsaved job and wakes up the poller of this process.
+        :return: False if the message has already been enqueued
+        """
+        job.run_at = timezone.now()
+        try:
+            await job.save()
+        except IntegrityError:
+            return False
+        self._wakeup.set()
+        return True
+
+    def start(self, bot: Bot, workers: int) -> None:
+        self._tasks = [
+            asyncio.create_task(self._work(bot), name=f"homework_worker_{i}")
+            for i in range(workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._poll(), name="homework_poller"))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._idle = 0
+
+        # claimed jobs no worker has started, let another process take them
+        while not self._jobs.empty():
+            job = self._jobs.get_nowait()
+            await HomeworkJob.filter(id=job.id, attempts=job.attempts).update(
+                status=JobStatus.PENDING,
+                attempts=job.attempts - 1,
+                run_at=timezone.now(),
+            )
+
+    async def _claim(self, limit: int) -> list[HomeworkJob]:
+        now = timezone.now()
+        due = (
+            await HomeworkJob.filter(status__in=ACTIVE_STATUSES, run_at__lte=now)
+            .select_related("owner")
+            .order_by("run_at")
+            .limit(limit)
+        )
+        lease_end = now + datetime.timedelta(seconds=config.HOMEWORK_JOB_LEASE)
+        jobs = []
+        for job in due:
+            claimed = await HomeworkJob.filter(
+                id=job.id, status__in=ACTIVE_STATUSES, attempts=job.attempts
+            ).update(
+                status=JobStatus.RUNNING, attempts=job.attempts + 1, run_at=lease_end
+            )
+            if claimed:
+                job.status = JobStatus.RUNNING
+                job.attempts += 1
+                job.run_at = lease_end
+                jobs.append(job)
+        return jobs
+
+    async def _poll(self) -> None:
+        while True:
+            # cleared before looking for jobs, so that a wakeup is never missed
+            self._wakeup.clear()
+            free = self._idle - self._jobs.qsize()
+            jobs = []
+            if free > 0:
+                try:
+                    jobs = await self._claim(free)
+                except Exception:
+                    logger.exception("Failed to claim homework jobs")
+            for job in jobs:
+                self._jobs.put_nowait(job)
+
+            if free > 0 and len(jobs) == free:
+                # more jobs may be due
+                continue
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(
+                    self._wakeup.wait(), config.HOMEWORK_POLL_INTERVAL
+                )
+
+    async def _work(self, bot: Bot) -> None:
+        while True:
+            self._idle += 1
+            self._wakeup.set()
+            try:
+                job = await self._jobs.get()
+            finally:
+                self._idle -= 1
+
+            try:
+                await self._run(bot, job)
+            except Exception:
+                # the job is taken over after its lease
+                logger.exception("Failed to finish homework job %d", job.id)
+
+    async def _run(self, bot: Bot, job: HomeworkJob) -> None:
+        started_at = time.perf_counter()
+        result = "cancelled"
+        try:
+            homework = await process_job(bot, job)
+        except asyncio.CancelledError:
+            # process is stopping, let another one take the job right away
+            await HomeworkJob.filter(id=job.id, attempts=job.attempts).update(
+                status=JobStatus.PENDING, run_at=timezone.now()
+            )
+            raise
+        except LeaseExpiredError:
+            logger.warning("Lease of homework job %d has expired", job.id)
+            result = "expired"
+        except Exception as e:
+            if job.attempts >= config.HOMEWORK_JOB_ATTEMPTS:
+                logger.exception("Homework job %d has failed", job.id)
+                result = "failed"
+                updated = await HomeworkJob.filter(
+                    id=job.id, attempts=job.attempts
+                ).update(status=JobStatus.FAILED, error=repr(e))
+                if updated:
+                    await self._notify(
+                        bot,
+                        job,
+                        _(
+                            "Не удалось обработать решение. Попробуй отправить его ещё раз."
+                        ),
+                    )
+                else:
+                    result = "expired"
+            else:
+                delay = config.HOMEWORK_RETRY_DELAY * 2 ** (job.attempts - 1)
+                logger.warning(
+                    "Homework job %d failed with %r, retrying in %.1fs",
+                    job.id,
+                    e,
+                    delay,
+                )
+                result = "retry"
+                updated = await HomeworkJob.filter(
+                    id=job.id, attempts=job.attempts
+                ).update(
+                    status=JobStatus.PENDING,
+                    run_at=timezone.now() + datetime.timedelta(seconds=delay),
+                    error=repr(e),
+                )
+                if not updated:
+                    result = "expired"
+        else:
+            result = "done"
+            if homework is None:
+                text = _("Решение уже отправлено.")
+            else:
+                text = _("Отправлено! ID решения — <code>{homework.id}</code>")
+            await self._notify(bot, job, text, homework=homework)
+        finally:
+            HOMEWORK_JOB_LATENCY.labels(result).observe(
+                time.perf_counter() - started_at
+            )
+
+    @staticmethod
+    async def _notify(bot: Bot, job: HomeworkJob, text: str, **kwargs: Any) -> None:
+        """
+        Edits the status message to the text translated for the student,
+        sends a new message if it can't be edited.
+        """
+        with (
+            i18n.context(),
+            i18n.use_locale(job.owner.lang_code or config.DEFAULT_LOCALE.lang_code),
+        ):
+            text = text.format(**kwargs)
+        if job.status_message_id is not None:
+            try:
+                await bot.edit_message_text(
+                    text, chat_id=job.chat_id, message_id=job.status_message_id
+                )
+            except TelegramBadRequest as e:
+                logger.warning("Failed to edit status of job %d: %s", job.id, e)
+            else:
+                return
+        await bot.send_message(job.chat_id, text)
+
+
+homework_queue = HomeworkQueue()
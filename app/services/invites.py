@@ -0,0 +1,84 @@
+"""
+Joining containers by invite links.
+
+Codes of a wrong format are rejected without any lookup, and codes that are
+not found are remembered for a short time, so guessing codes never puts load
+on the database.
+"""
+
+import logging
+
+from redis.asyncio import Redis
+
+from app import config
+from app.cache import LRUCache
+from app.misc import redis
+from app.models import Container, User
+from app.models.container import INVITE_CODE_RE
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownInvites:
+    """
+    Negative cache of invite codes: in-process LRU in front of optional Redis.
+    """
+
+    def __init__(self, maxsize: int, ttl: int, redis_: Redis | None = None) -> None:
+        self.local = LRUCache(maxsize, ttl)
+        self.redis = redis_
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(code: str) -> str:
+        return f"invite:unknown:{code}"
+
+    async def contains(self, code: str) -> bool:
+        if self.local.get(code):
+            return True
+        if self.redis is not None and await self.redis.exists(self._key(code)):
+            self.local.set(code, True)
+            return True
+        return False
+
+    async def add(self, code: str) -> None:
+        self.local.set(code, True)
+        if self.redis is not None:
+            await self.redis.set(self._key(code), 1, ex=self.ttl)
+
+    async def discard(self, code: str) -> None:
+        self.local.pop(code)
+        if self.redis is not None:
+            await self.redis.delete(self._key(code))
+
+
+unknown_invites = UnknownInvites(
+    config.UNKNOWN_INVITES_CACHE_SIZE, config.UNKNOWN_INVITES_TTL, redis
+)
+
+
+async def find_container(code: str) -> Container | None:
+    """
+    :param code: Invite code from the link
+    :return: Container or None if the code is invalid or unknown
+    """
+    if not INVITE_CODE_RE.fullmatch(code) or await unknown_invites.contains(code):
+        return None
+
+    container = await Container.get_or_none(invite_code=code).only(
+        "id", "name", "owner_id"
+    )
+    if container is None:
+        logger.info("Unknown invite code %s", code)
+        await unknown_invites.add(code)
+    return container
+
+
+async def join_container(container: Container, user: User) -> bool:
+    """
+    Makes user a participant of the container.
+    :return: True if the user has joined, False if already was in the container
+    """
+    if container.owner_id == user.id:
+        return False
+    return await Container.add_participant(container.id, user.id)
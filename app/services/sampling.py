@@ -0,0 +1,199 @@
+"""
+Choice of the part of a homework text that is sent to GPT.
+
+The beginning of a long report is mostly its title page and table of
+contents, which say little about the subject. Samplers are registered by
+name with @sampler and selected with GPT_SAMPLING:
+
+- "spread" drops boilerplate and low-information lines, then takes chunks
+  from the head, the middle and the tail of what is left;
+- "clean" drops the same lines and takes the beginning;
+- "head" takes the beginning of the text as is.
+
+Boilerplate are lines of title pages ("Министерство...", "Выполнил:"),
+tables of contents, page numbers, copyright and lines repeated on every page. Lines
+with few letters or low entropy of characters (separators, numbers, the
+same word over and over) carry little information as well.
+"""
+
+import bisect
+import itertools
+import math
+import re
+from collections import Counter
+from collections.abc import Callable, Iterator
+
+from app import config
+
+Sampler = Callable[[str, int], str]
+# name -> sampler, see sampler()
+SAMPLERS: dict[str, Sampler] = {}
+
+# Shares of the budget taken from the head, the middle and the tail
+SPREAD_SHARES = (0.4, 0.3, 0.3)
+# Put between chunks that are not adjacent in the text
+GAP = "\n...\n"
+# Longer lines are cut into chunks of at most this length
+CHUNK_SYMBOLS = 400
+# Lines with fewer letters are dropped
+MIN_LETTERS = 3
+# Lines of at least LOW_ENTROPY_LENGTH characters are dropped if entropy
+# of their first ENTROPY_SYMBOLS characters is below LOW_ENTROPY_BITS.
+# Prose has about 4 bits
+LOW_ENTROPY_LENGTH = 16
+ENTROPY_SYMBOLS = 64
+LOW_ENTROPY_BITS = 2.5
+
+BOILERPLATE_RE = re.compile(
+    r"""
+    # title pages
+    (министерство|федеральное\s+государственное|высшего\s+образования
+      |ministry\s+of)\b
+    | (выполнил|выполнила|проверил|проверила|принял|студент\w*\s+(гр\.|группы)
+      |submitted\s+by)\b
+    | (преподаватель|научный\s+руководитель|supervisor|instructor)\s*:
+    # headings of contents and references
+    | (содержание|оглавление|contents|table\s+of\s+contents|список\s+литературы
+      |список\s+использованных\s+источников|references|bibliography)\s*:?\s*$
+    # page numbers
+    | (стр\.|страница|page)\s*\d+(\s*(из|of)\s*\d+)?\s*$
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+# Lines of contents with leaders and page numbers, searched in the whole line
+LEADERS_RE = re.compile(r"(\.{4,}|…{2,}|_{4,})\s*\d+\s*$")
+# MIN_LETTERS letters in a line
+LETTERS_RE = re.compile(rf"[^\W\d_](?:[\W\d_]*[^\W\d_]){{{MIN_LETTERS - 1}}}")
+DIGITS_RE = re.compile(r"\d+")
+
+
+def sampler(name: str) -> Callable[[Sampler], Sampler]:
+    """
+    Registers function choosing up to `budget` characters of text,
+    called as func(text, budget).
+    """
+
+    def decorator(func: Sampler) -> Sampler:
+        SAMPLERS[name] = func
+        return func
+
+    return decorator
+
+
+def entropy(line: str) -> float:
+    """
+    Shannon entropy of characters of the line, in bits.
+    """
+    counts = Counter(line).values()
+    return math.log2(len(line)) - sum(c * math.log2(c) for c in counts) / len(line)
+
+
+def is_informative(line: str) -> bool:
+    if not LETTERS_RE.search(line):
+        return False
+    if BOILERPLATE_RE.match(line) or "©" in line:
+        return False
+    if line[-1].isdigit() and LEADERS_RE.search(line):
+        return False
+    return (
+        len(line) < LOW_ENTROPY_LENGTH
+        or entropy(line[:ENTROPY_SYMBOLS]) >= LOW_ENTROPY_BITS
+    )
+
+
+def clean_lines(text: str) -> Iterator[str]:
+    """
+    Yields informative lines of the text, each once, with collapsed whitespace.
+    Lines differing only in digits, like headers with page numbers, are
+    considered the same.
+    """
+    seen = set()
+    for raw_line in text.splitlines():
+        line = " ".join(raw_line.split())
+        if not line or not is_informative(line):
+            continue
+        key = DIGITS_RE.sub("#", line.lower())
+        if key in seen:
+            continue
+        seen.add(key)
+        yield line
+
+
+def chunks(lines: Iterator[str]) -> Iterator[str]:
+    """
+    Cuts lines longer than CHUNK_SYMBOLS at spaces.
+    """
+    for line in lines:
+        rest = line
+        while len(rest) > CHUNK_SYMBOLS:
+            cut = rest.rfind(" ", 0, CHUNK_SYMBOLS)
+            if cut <= 0:
+                cut = CHUNK_SYMBOLS
+            yield rest[:cut]
+            rest = rest[cut:].lstrip()
+        if rest:
+            yield rest
+
+
+@sampler("head")
+def sample_head(text: str, budget: int) -> str:
+    return text[:budget]
+
+
+@sampler("clean")
+def sample_clean(text: str, budget: int) -> str:
+    return "\n".join(clean_lines(text))[:budget]
+
+
+def _take(parts: list[str], indices: range, budget: int, taken: dict[int, str]) -> None:
+    """
+    Adds parts at indices, in this order, to taken until budget is spent.
+    The last one is truncated to fit.
+    """
+    for index in indices:
+        if budget <= 0:
+            return
+        if index in taken:
+            continue
+        taken[index] = parts[index][:budget]
+        budget -= len(parts[index]) + 1
+
+
+@sampler("spread")
+def sample_spread(text: str, budget: int) -> str:
+    parts = list(chunks(clean_lines(text)))
+    offsets = list(itertools.accumulate((len(part) + 1 for part in parts), initial=0))
+    if offsets[-1] <= budget:
+        return "\n".join(parts)
+
+    budget -= 2 * len(GAP)
+    head, middle, tail = (int(budget * share) for share in SPREAD_SHARES)
+    # the middle sample is centered by characters, not by chunks
+    center = bisect.bisect_left(offsets, (offsets[-1] - middle) // 2)
+
+    taken: dict[int, str] = {}
+    _take(parts, range(len(parts)), head, taken)
+    _take(parts, range(len(parts) - 1, -1, -1), tail, taken)
+    _take(parts, range(center, len(parts)), middle, taken)
+
+    result = []
+    previous = None
+    for index in sorted(taken):
+        if previous is not None:
+            result.append("\n" if index == previous + 1 else GAP)
+        result.append(taken[index])
+        previous = index
+    return "".join(result)
+
+
+if config.GPT_SAMPLING not in SAMPLERS:
+    raise ValueError(
+        f"Unknown GPT_SAMPLING {config.GPT_SAMPLING!r}, expected one of {list(SAMPLERS)}"
+    )
+
+
+def sample_text(text: str) -> str:
+    """
+    Chooses up to GPT_SYMBOLS_LIMIT characters of text with GPT_SAMPLING.
+    """
+    return SAMPLERS[config.GPT_SAMPLING](text, config.GPT_SYMBOLS_LIMIT)
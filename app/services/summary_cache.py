@@ -0,0 +1,151 @@
+"""
+Cache of homework summaries, keyed by hash of the normalized text, i.e.
+of the sample sent to GPT.
+
+Lookups go through in-process LRU, then Redis (if configured), then the
+Summary table. Concurrent requests for the same text share one GPT call.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import logging
+
+from redis.asyncio import Redis
+from tortoise import timezone
+
+from app import config
+from app.cache import LRUCache
+from app.misc import redis
+from app.models import Summary
+from app.services.gpt import summarize_homework_text
+from app.services.sampling import sample_text
+
+logger = logging.getLogger(__name__)
+
+PURGE_EVERY = 100
+
+
+def normalize_text(text: str) -> str:
+    """
+    Samples the part of text that is sent to GPT and collapses its whitespace.
+    """
+    return " ".join(sample_text(text).split())
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class SummaryCache:
+    def __init__(
+        self, maxsize: int, max_rows: int, ttl: datetime.timedelta, redis_: Redis | None
+    ) -> None:
+        self.local = LRUCache(maxsize, ttl.total_seconds())
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.redis = redis_
+        self._inflight: dict[str, asyncio.Future[str]] = {}
+        self._stored = 0
+
+    @staticmethod
+    def _key(digest: str) -> str:
+        return f"summary:{digest}"
+
+    async def summarize(self, text: str) -> str:
+        """
+        Returns a cached summary of the text, calling GPT only on a miss.
+        """
+        text = normalize_text(text)
+        if not text:
+            return ""
+        digest = text_digest(text)
+
+        summary = self.local.get(digest)
+        if summary is not None:
+            return summary
+
+        while future := self._inflight.get(digest):
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling() or not future.cancelled():
+                    raise
+                # the call was made by a task that has been cancelled, e.g. on
+                # shutdown. Its waiters were not, they look the summary up again
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[digest] = future
+        try:
+            summary = await self._load(digest)
+            if summary is None:
+                summary = await summarize_homework_text(text)
+                await self._store(digest, summary)
+            self.local.set(digest, summary)
+            future.set_result(summary)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # the caller gets the exception, waiters get it through the future
+            future.exception()
+            raise
+        finally:
+            del self._inflight[digest]
+
+        return summary
+
+    async def _load(self, digest: str) -> str | None:
+        if self.redis is not None:
+            raw = await self.redis.get(self._key(digest))
+            if raw is not None:
+                return raw.decode()
+
+        now = timezone.now()
+        updated = await Summary.filter(
+            digest=digest, created_at__gt=now - self.ttl
+        ).update(used_at=now)
+        if not updated:
+            return None
+
+        summary = await Summary.get(digest=digest).values_list("summary", flat=True)
+        if self.redis is not None:
+            await self.redis.set(self._key(digest), summary, ex=self.ttl)
+        return summary
+
+    async def _store(self, digest: str, summary: str) -> None:
+        now = timezone.now()
+        await Summary.update_or_create(
+            {"summary": summary, "created_at": now, "used_at": now}, digest=digest
+        )
+        if self.redis is not None:
+            await self.redis.set(self._key(digest), summary, ex=self.ttl)
+
+        self._stored += 1
+        if self._stored % PURGE_EVERY == 0:
+            await self.purge()
+
+    async def purge(self) -> None:
+        """
+        Removes expired rows and least recently used rows above max_rows.
+        """
+        now = timezone.now()
+        expired = await Summary.filter(created_at__lte=now - self.ttl).delete()
+        excess = await (
+            Summary.all()
+            .order_by("-used_at")
+            .offset(self.max_rows)
+            .values_list("digest", flat=True)
+        )
+        if excess:
+            await Summary.filter(digest__in=excess).delete()
+        logger.info("Purged %d expired and %d excess summaries", expired, len(excess))
+
+
+summary_cache = SummaryCache(
+    config.SUMMARY_CACHE_SIZE,
+    config.SUMMARY_CACHE_MAX_ROWS,
+    datetime.timedelta(days=config.SUMMARY_CACHE_TTL_DAYS),
+    redis,
+)
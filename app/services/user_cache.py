@@ -0,0 +1,108 @@
+"""
+Two-tier cache of User rows: in-process LRU in front of optional Redis.
+
+Every update passes through ACLMiddleware, so without the cache each button
+press costs a SELECT. Code that modifies a user must save only the changed
+fields and call user_cache.invalidate() after saving: the user may be stale
+in other fields changed by another process meanwhile, so it is not stored
+back. With Redis, the in-process tier of other processes is not invalidated,
+so it only lives for local_ttl seconds.
+"""
+
+import datetime
+import json
+import logging
+
+from redis.asyncio import Redis
+
+from app import config
+from app.cache import LRUCache
+from app.misc import redis
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+
+def _dump(user: User) -> str:
+    return json.dumps(
+        {
+            "id": user.id,
+            "created_at": user.created_at.isoformat(),
+            "lang_code": user.lang_code,
+            "fio": user.fio,
+        }
+    )
+
+
+def _load(raw: bytes) -> User:
+    data = json.loads(raw)
+    user = User(
+        id=data["id"],
+        created_at=datetime.datetime.fromisoformat(data["created_at"]),
+        lang_code=data["lang_code"],
+        fio=data["fio"],
+    )
+    user._saved_in_db = True  # restored from cache, save() must UPDATE
+    return user
+
+
+class UserCache:
+    def __init__(
+        self, maxsize: int, ttl: int, redis_: Redis | None = None, local_ttl: int = 0
+    ) -> None:
+        self.local = LRUCache(maxsize, local_ttl if redis_ is not None else ttl)
+        self.redis = redis_
+        self.ttl = ttl
+        self.redis_hits = 0
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"user:{user_id}"
+
+    async def get(self, user_id: int) -> User | None:
+        """
+        Returns user from the nearest tier, falling back to the database.
+        :param user_id: Telegram user ID
+        :return: User or None if it does not exist in the database
+        """
+        user = self.local.get(user_id)
+        if user is not None:
+            return user
+
+        if self.redis is not None:
+            raw = await self.redis.get(self._key(user_id))
+            if raw is not None:
+                self.redis_hits += 1
+                user = _load(raw)
+                self.local.set(user_id, user)
+                return user
+
+        user = await User.get_or_none(id=user_id)
+        if user is not None:
+            await self.set(user)
+        return user
+
+    async def set(self, user: User) -> None:
+        """
+        Stores the user in all tiers, as just read or created.
+        """
+        self.local.set(user.id, user)
+        if self.redis is not None:
+            await self.redis.set(self._key(user.id), _dump(user), ex=self.ttl)
+
+    async def invalidate(self, user_id: int) -> None:
+        self.local.pop(user_id)
+        if self.redis is not None:
+            await self.redis.delete(self._key(user_id))
+
+    def stats(self) -> dict[str, int]:
+        """
+        :return: Local tier stats plus Redis hits. Misses of the local tier
+            minus redis_hits is the number of DB lookups.
+        """
+        return self.local.stats() | {"redis_hits": self.redis_hits}
+
+
+user_cache = UserCache(
+    config.USER_CACHE_SIZE, config.USER_CACHE_TTL, redis, config.USER_CACHE_LOCAL_TTL
+)
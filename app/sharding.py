@@ -0,0 +1,244 @@
+"""
+Horizontal scaling: updates are sharded by user ID across worker processes.
+
+The process that receives updates from Telegram (polling or webhook) does not
+handle them itself when SHARDS > 0. ShardingMiddleware pushes each update into
+a Redis list chosen by consistent hashing of the user ID, and every worker
+(`python -m app worker <shard>`) consumes exactly one list. All updates of a
+user land in the same worker, which processes them one by one, while updates
+of different users run concurrently. An update stays in Redis until its
+worker has processed it: updates of a crashed worker are processed again
+after its restart, so they are delivered at least once.
+
+Workers may run on any node that can reach Redis and the database. Changing
+SHARDS remaps only ~1/SHARDS of users, but updates already queued for a
+removed shard are processed only after that shard is started again.
+"""
+
+import asyncio
+import bisect
+import collections
+import hashlib
+import logging
+import multiprocessing
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject, Update
+from pydantic import ValidationError
+
+from app import config
+from app.misc import bot, dp, redis
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "updates:shard:{}"
+# Updates of the shard taken by its worker and not yet processed
+PROCESSING_KEY = "updates:shard:{}:processing"
+# Updates read ahead of processing, per slot of UPDATES_CONCURRENCY
+PENDING_PER_SLOT = 10
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest())
+
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes.
+    """
+
+    def __init__(self, shards: int, replicas: int = 64) -> None:
+        points = sorted(
+            (_hash(f"shard-{shard}-{i}"), shard)
+            for shard in range(shards)
+            for i in range(replicas)
+        )
+        self._keys = [key for key, __ in points]
+        self._shards = [shard for __, shard in points]
+
+    def get_shard(self, key: int) -> int:
+        index = bisect.bisect(self._keys, _hash(str(key))) % len(self._keys)
+        return self._shards[index]
+
+
+def get_update_user_id(update: Update) -> int:
+    """
+    :return: ID of the user who sent the update, or 0 if there is none.
+    """
+    event = update.event
+    if from_user := getattr(event, "from_user", None):
+        return from_user.id
+    if chat := getattr(event, "chat", None):
+        return chat.id
+    return 0
+
+
+class ShardingMiddleware(BaseMiddleware):
+    """
+    Outer middleware of the receiving process. Forwards updates to the shard
+    queues instead of handling them.
+    """
+
+    def __init__(self, shards: int) -> None:
+        if redis is None:
+            raise RuntimeError("REDIS_URL must be set when SHARDS > 0")
+        self.ring = HashRing(shards)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        shard = self.ring.get_shard(get_update_user_id(event))
+        await redis.rpush(
+            QUEUE_KEY.format(shard),
+            event.model_dump_json(exclude_none=True, by_alias=True),
+        )
+
+
+class SerialPerUserExecutor:
+    """
+    Runs coroutines concurrently, but strictly one after another for the same
+    user. Work of a user waits in the user's own queue and takes one of the
+    `concurrency` slots only when it starts, so a user sending many updates
+    delays only their own.
+    """
+
+    def __init__(self, concurrency: int, max_pending: int) -> None:
+        self._slots = asyncio.Semaphore(concurrency)
+        self._pending = asyncio.Semaphore(max_pending)
+        self._queues: dict[int, collections.deque[Callable[[], Awaitable[Any]]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, user_id: int, func: Callable[[], Awaitable[Any]]) -> None:
+        """
+        Schedules func after all previously submitted work of this user.
+        Waits while `max_pending` functions are queued or running.
+        """
+        await self._pending.acquire()
+        if (queue := self._queues.get(user_id)) is not None:
+            queue.append(func)
+            return
+
+        self._queues[user_id] = collections.deque([func])
+        task = asyncio.create_task(self._drain(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, user_id: int) -> None:
+        queue = self._queues[user_id]
+        while queue:
+            # stays in the queue while running, so that submit() appends to it
+            func = queue[0]
+            try:
+                async with self._slots:
+                    await func()
+            except Exception:
+                logger.exception("Failed to process update")
+            finally:
+                queue.popleft()
+                self._pending.release()
+        del self._queues[user_id]
+
+    async def join(self) -> None:
+        while self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+
+async def requeue_unprocessed(shard: int) -> None:
+    """
+    Returns updates left in the processing list by a crashed worker to the
+    head of the shard queue, in their original order.
+    """
+    moved = 0
+    while await redis.lmove(
+        PROCESSING_KEY.format(shard), QUEUE_KEY.format(shard), "RIGHT", "LEFT"
+    ):
+        moved += 1
+    if moved:
+        logger.warning("Requeued %d unprocessed updates of shard %d", moved, shard)
+
+
+async def consume_shard(shard: int, **kwargs: Any) -> None:
+    """
+    Feeds updates from the shard queue to the dispatcher until cancelled.
+    Each update is moved to the processing list of the shard while it is
+    handled, and removed from there afterwards, so that updates taken by a
+    crashed worker are handled after its restart.
+    :param shard: Shard number
+    :param kwargs: Additional data passed to handlers
+    """
+    executor = SerialPerUserExecutor(
+        config.UPDATES_CONCURRENCY, config.UPDATES_CONCURRENCY * PENDING_PER_SLOT
+    )
+    key = QUEUE_KEY.format(shard)
+    processing_key = PROCESSING_KEY.format(shard)
+
+    async def process(update: Update, raw: bytes) -> None:
+        try:
+            result = await dp.feed_update(bot, update, **kwargs)
+            if isinstance(result, TelegramMethod):
+                await dp.silent_call_request(bot, result)
+        except Exception:
+            logger.exception("Failed to process update %d", update.update_id)
+        # a cancelled update stays in the processing list until restart
+        await redis.lrem(processing_key, 1, raw)
+
+    await requeue_unprocessed(shard)
+    logger.info("Worker for shard %d started", shard)
+    try:
+        while True:
+            raw = await redis.blmove(key, processing_key, 5, "LEFT", "RIGHT")
+            if raw is None:
+                continue
+            try:
+                update = Update.model_validate_json(raw, context={"bot": bot})
+            except ValidationError:
+                logger.exception("Dropping invalid update %r", raw)
+                await redis.lrem(processing_key, 1, raw)
+                continue
+            await executor.submit(
+                get_update_user_id(update), lambda u=update, r=raw: process(u, r)
+            )
+    finally:
+        await executor.join()
+
+
+async def run_worker(shard: int) -> None:
+    await dp.emit_startup(bot=bot, worker_id=shard, **dp.workflow_data)
+    try:
+        await consume_shard(shard, worker_id=shard)
+    finally:
+        await dp.emit_shutdown(bot=bot, worker_id=shard, **dp.workflow_data)
+        await bot.session.close()
+
+
+def _worker_main(shard: int) -> None:
+    asyncio.run(run_worker(shard))
+
+
+def run_workers(shards: Iterable[int]) -> None:
+    """
+    Runs workers for the given shards, each one in a separate process.
+    """
+    if redis is None:
+        raise RuntimeError("REDIS_URL must be set to run workers")
+
+    shards = list(shards)
+    if len(shards) == 1:
+        _worker_main(shards[0])
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(target=_worker_main, args=(shard,), name=f"worker-{shard}")
+        for shard in shards
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
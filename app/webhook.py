@@ -0,0 +1,86 @@
+"""
+Webhook runner, an alternative to long polling.
+
+Telegram pushes updates to an aiohttp server, so several instances can run
+behind a load balancer. Enabled with RUN_MODE=webhook.
+"""
+
+import asyncio
+import logging
+from typing import Any
+
+from aiogram import Bot
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from app import config
+from app.misc import bot, dp
+
+logger = logging.getLogger(__name__)
+
+
+class LimitedRequestHandler(SimpleRequestHandler):
+    """
+    Processes updates in background, but not more than `concurrency` at once.
+    When the limit is reached, the request is held open, so Telegram
+    slows down instead of the process piling up tasks.
+    """
+
+    def __init__(self, *args: Any, concurrency: int, **kwargs: Any) -> None:
+        super().__init__(*args, handle_in_background=True, **kwargs)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _handle_request_background(
+        self, bot: Bot, request: web.Request
+    ) -> web.Response:
+        await self._semaphore.acquire()
+        try:
+            return await super()._handle_request_background(bot, request)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def _background_feed_update(self, bot: Bot, update: dict[str, Any]) -> None:
+        try:
+            await super()._background_feed_update(bot, update)
+        finally:
+            self._semaphore.release()
+
+
+async def health_handler(__: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+def create_app() -> web.Application:
+    app = web.Application()
+    LimitedRequestHandler(
+        dp,
+        bot,
+        secret_token=config.WEBHOOK_SECRET or None,
+        concurrency=config.UPDATES_CONCURRENCY,
+    ).register(app, path=config.WEBHOOK_PATH)
+    app.router.add_get("/health", health_handler)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def set_webhook() -> None:
+    if not config.WEBHOOK_BASE_URL:
+        raise RuntimeError("WEBHOOK_BASE_URL must be set when RUN_MODE=webhook")
+
+    await bot.set_webhook(
+        config.WEBHOOK_BASE_URL.rstrip("/") + config.WEBHOOK_PATH,
+        secret_token=config.WEBHOOK_SECRET or None,
+        allowed_updates=config.ALLOWED_UPDATES,
+        max_connections=config.WEBHOOK_MAX_CONNECTIONS,
+    )
+    logger.info("Webhook is set to %s", config.WEBHOOK_BASE_URL)
+
+
+def run_webhook() -> None:
+    web.run_app(
+        create_app(),
+        host=config.WEBHOOK_HOST,
+        port=config.WEBHOOK_PORT,
+        print=None,
+    )
@@ -1,4 +1,5 @@
 from app.widgets.emojize import Emojize
+from app.widgets.paginated_select import PaginatedSelect
 from app.widgets.start_same_data import StartWithSameData
 
-__all__ = ["Emojize", "StartWithSameData"]
+__all__ = ["Emojize", "PaginatedSelect", "StartWithSameData"]
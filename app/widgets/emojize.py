@@ -1,18 +1,56 @@
-from typing import Any
+from collections.abc import Iterable
+from typing import Any, ClassVar
+from weakref import WeakSet
 
 import emoji
+from aiogram.utils.i18n import I18n
 from aiogram_dialog import DialogManager
 from aiogram_dialog.widgets.text import Const
+from babel.support import LazyProxy
 
 
 class Emojize(Const):
     """
     Emojize text using `emoji` library.
     Besides str, it can accept LazyProxy and Text objects as well.
+
+    Static text (str or LazyProxy) is emojized once per locale and memoized,
+    Emojize.precompile() does it for all locales in advance. Text objects are
+    emojized on every render, since their output depends on data.
     """
 
+    _instances: ClassVar[WeakSet["Emojize"]] = WeakSet()
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
+        # locale -> emojized text, the key is None for str
+        self._compiled: dict[str | None, str] = {}
+        Emojize._instances.add(self)
+
+    def _compile(self, locale: str | None) -> str:
+        compiled = emoji.emojize(str(self.text), language="alias")
+        self._compiled[locale] = compiled
+        return compiled
+
+    @classmethod
+    def precompile(cls, i18n: I18n, locales: Iterable[str]) -> int:
+        """
+        Emojizes static texts of all Emojize widgets for each locale.
+        :return: Number of compiled texts
+        """
+        locales = list(locales)
+        count = 0
+        with i18n.context():
+            for widget in cls._instances:
+                if isinstance(widget.text, LazyProxy):
+                    for locale in locales:
+                        with i18n.use_locale(locale):
+                            widget._compile(locale)
+                        count += 1
+                elif isinstance(widget.text, str):
+                    widget._compile(None)
+                    count += 1
+        return count
 
     async def _render_text(
         self,
@@ -22,5 +60,12 @@ class Emojize(Const):
         text = self.text
         if hasattr(text, "render_text"):
             text = await text.render_text(data, manager)
+            return emoji.emojize(str(text), language="alias")
 
-        return emoji.emojize(str(text), language="alias")
+        locale = None
+        if isinstance(text, LazyProxy):
+            locale = I18n.get_current().current_locale
+        compiled = self._compiled.get(locale)
+        if compiled is None:
+            compiled = self._compile(locale)
+        return compiled
@@ -0,0 +1,164 @@
+import math
+import operator
+import re
+from collections.abc import Callable
+from typing import Any, TypedDict
+
+from aiogram.types import CallbackQuery, InlineKeyboardButton
+from aiogram_dialog import DialogManager
+from aiogram_dialog.api.internal import RawKeyboard
+from aiogram_dialog.api.protocols import DialogProtocol
+from aiogram_dialog.widgets.common import WhenCondition
+from aiogram_dialog.widgets.kbd import Select
+from aiogram_dialog.widgets.kbd.select import OnItemClick, TypeFactory
+from aiogram_dialog.widgets.text import Text
+from aiogram_dialog.widgets.widget_event import WidgetEventProcessor
+from tortoise.queryset import QuerySet
+
+QueryFactory = Callable[[dict, DialogManager], QuerySet]
+
+# "#<page>", optionally followed by "<" or ">" and a cursor
+PAGER_RE = re.compile(r"#(\d+)(?:([<>])(\d*))?")
+
+
+class PageState(TypedDict):
+    page: int
+    cursor: int | None
+    reverse: bool
+
+
+FIRST_PAGE = PageState(page=0, cursor=None, reverse=False)
+
+
+class PaginatedSelect(Select):
+    """
+    Select that fetches only the shown page from the DB, with keyset pagination
+    on an integer `key` field. Renders the same pager as ScrollingGroup.
+
+    Rendering costs one COUNT query and one query of `height` rows, regardless
+    of the total number of items. The page and its cursor are kept in widget data.
+    Query must not join to-many relations, otherwise COUNT sees duplicates.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        text: Text,
+        id: str,  # noqa: A002
+        query: QueryFactory,
+        key: str = "id",
+        type_factory: TypeFactory = str,
+        on_click: OnItemClick | WidgetEventProcessor | None = None,
+        height: int = 10,
+        hide_on_single_page: bool = False,
+        when: WhenCondition = None,
+    ) -> None:
+        super().__init__(
+            text=text,
+            id=id,
+            item_id_getter=operator.attrgetter(key),
+            items=(),
+            type_factory=type_factory,
+            on_click=on_click,
+            when=when,
+        )
+        self.query = query
+        self.key = key
+        self.height = height
+        self.hide_on_single_page = hide_on_single_page
+
+    def get_state(self, manager: DialogManager) -> PageState:
+        return self.get_widget_data(manager, FIRST_PAGE)
+
+    async def _fetch_page(
+        self, queryset: QuerySet, state: PageState, count: int
+    ) -> list[Any]:
+        cursor = state["cursor"]
+        if not state["reverse"]:
+            if cursor is not None:
+                queryset = queryset.filter(**{f"{self.key}__gt": cursor})
+            return await queryset.order_by(self.key).limit(self.height)
+
+        if cursor is None:
+            # last page, aligned with the pages counted from the start
+            limit = count - state["page"] * self.height
+        else:
+            queryset = queryset.filter(**{f"{self.key}__lt": cursor})
+            limit = self.height
+        items = await queryset.order_by(f"-{self.key}").limit(limit)
+        return items[::-1]
+
+    async def _render_keyboard(
+        self,
+        data: dict,
+        manager: DialogManager,
+    ) -> RawKeyboard:
+        queryset = self.query(data, manager)
+        count = await queryset.count()
+        pages = math.ceil(count / self.height)
+
+        state = self.get_state(manager)
+        items = []
+        if state["page"] < pages:
+            items = await self._fetch_page(queryset, state, count)
+        if not items and count:
+            # items were removed since the cursor was saved
+            state = FIRST_PAGE
+            items = await self._fetch_page(queryset, state, count)
+
+        offset = state["page"] * self.height
+        keyboard = [
+            [await self._render_button(offset + pos, item, item, data, manager)]
+            for pos, item in enumerate(items)
+        ]
+        return keyboard + self._render_pager(state["page"], pages, items)
+
+    def _render_pager(self, page: int, pages: int, items: list[Any]) -> RawKeyboard:
+        if pages == 0 or (pages == 1 and self.hide_on_single_page):
+            return []
+
+        first_key = self.item_id_getter(items[0])
+        last_key = self.item_id_getter(items[-1])
+        prev_data = f"#{page - 1}<{first_key}" if page > 0 else "#0"
+        next_data = f"#{page + 1}>{last_key}" if page < pages - 1 else "#"
+        return [
+            [
+                InlineKeyboardButton(
+                    text="1", callback_data=self._item_callback_data("#0")
+                ),
+                InlineKeyboardButton(
+                    text="<", callback_data=self._item_callback_data(prev_data)
+                ),
+                InlineKeyboardButton(
+                    text=str(page + 1), callback_data=self._item_callback_data("#")
+                ),
+                InlineKeyboardButton(
+                    text=">", callback_data=self._item_callback_data(next_data)
+                ),
+                InlineKeyboardButton(
+                    text=str(pages),
+                    callback_data=self._item_callback_data(f"#{pages - 1}<"),
+                ),
+            ],
+        ]
+
+    async def _process_item_callback(
+        self,
+        callback: CallbackQuery,
+        data: str,
+        dialog: DialogProtocol,
+        manager: DialogManager,
+    ) -> bool:
+        if not data.startswith("#"):
+            return await super()._process_item_callback(callback, data, dialog, manager)
+
+        if match := PAGER_RE.fullmatch(data):
+            page, direction, cursor = match.groups()
+            self.set_widget_data(
+                manager,
+                PageState(
+                    page=int(page),
+                    cursor=int(cursor) if cursor else None,
+                    reverse=direction == "<",
+                ),
+            )
+        return True
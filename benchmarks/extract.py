@@ -0,0 +1,243 @@
+"""
+Time of text extraction per format, on large generated documents.
+
+For each format in app/services/extract.py, builds a sample file of about
+--size MB and measures extraction in-process with the EXTRACT_SYMBOLS_LIMIT
+(what the bot does), in-process without a limit (the whole document) and
+through the extractor process pool, which adds transfer of the file.
+
+Run from the repository root:
+    python -m benchmarks.extract --size 5 --repeat 5
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import zipfile
+from collections.abc import Callable
+
+WORDS = [
+    "matrix", "vector", "basis", "rank", "determinant", "integral",
+    "derivative", "limit", "series", "function", "algorithm", "complexity",
+    "graph", "tree", "queue", "stack", "array", "energy", "momentum", "force",
+]  # fmt: skip
+# Enough for the bot to import its config, nothing is sent anywhere
+DUMMY_ENV = {
+    "BOT_TOKEN": "123456:BENCHMARK",
+    "UPLOAD_FILES_CHAT_ID": "1",
+    "YANDEX_API_KEY": "benchmark",
+    "YANDEX_FOLDER_ID": "benchmark",
+    "API_ID": "1",
+    "API_HASH": "benchmark",
+}
+
+
+def random_line(words: int = 12) -> str:
+    return " ".join(random.choices(WORDS, k=words))
+
+
+def lines(size: int) -> list[str]:
+    result = []
+    length = 0
+    while length < size:
+        line = random_line()
+        result.append(line)
+        length += len(line) + 1
+    return result
+
+
+def make_txt(size: int) -> bytes:
+    return "\n".join(lines(size)).encode()
+
+
+def make_py(size: int) -> bytes:
+    code = [
+        f"def f{i}(x):\n    # {line}\n    return x * {i}\n"
+        for i, line in enumerate(lines(size // 2))
+    ]
+    return "\n".join(code).encode()
+
+
+def make_docx(size: int) -> bytes:
+    ns = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    paragraphs = "".join(
+        f"<w:p><w:r><w:t>{line}</w:t></w:r></w:p>" for line in lines(size // 2)
+    )
+    document = (
+        f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{ns}">'
+        f"<w:body>{paragraphs}</w:body></w:document>"
+    )
+    file = io.BytesIO()
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr("[Content_Types].xml", "<Types/>")
+        zipf.writestr("word/document.xml", document)
+    return file.getvalue()
+
+
+def make_odt(size: int) -> bytes:
+    ns = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+    paragraphs = "".join(f"<text:p>{line}</text:p>" for line in lines(size // 2))
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?><office:document-content '
+        'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+        f'xmlns:text="{ns}"><office:body><office:text>{paragraphs}'
+        "</office:text></office:body></office:document-content>"
+    )
+    file = io.BytesIO()
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr(
+            "mimetype",
+            "application/vnd.oasis.opendocument.text",
+            compress_type=zipfile.ZIP_STORED,
+        )
+        zipf.writestr("content.xml", content)
+    return file.getvalue()
+
+
+def make_ipynb(size: int) -> bytes:
+    cells = []
+    length = 0
+    while length < size:
+        source = [line + "\n" for line in lines(500)]
+        output = {"output_type": "stream", "name": "stdout", "text": lines(2000)}
+        cells.append(
+            {"cell_type": "code", "source": source, "outputs": [output]},
+        )
+        cells.append({"cell_type": "markdown", "source": random_line()})
+        length += 3000
+    return json.dumps({"cells": cells, "nbformat": 4, "nbformat_minor": 5}).encode()
+
+
+def make_zip(size: int) -> bytes:
+    file = io.BytesIO()
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for i in range(10):
+            zipf.writestr(f"lab/image{i}.png", random.randbytes(size // 20))
+            zipf.writestr(f"lab/task{i}.py", make_py(size // 20))
+    return file.getvalue()
+
+
+def make_pdf(size: int) -> bytes:
+    """
+    Builds PDF with pages of text in a standard font.
+    """
+    page_lines = 60
+    text_lines = lines(size)
+    pages = [
+        text_lines[i : i + page_lines] for i in range(0, len(text_lines), page_lines)
+    ]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in pages:
+        text = " T* ".join(f"({line}) Tj" for line in page)
+        stream = f"BT /F1 9 Tf 40 800 Td 12 TL {text} ET".encode()
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        kids.append(len(objects) + 1)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (len(objects))
+        )
+    refs = " ".join(f"{kid} 0 R" for kid in kids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (refs, len(kids))
+
+    file = io.BytesIO()
+    file.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(file.tell())
+        file.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = file.tell()
+    file.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        file.write(b"%010d 00000 n \n" % offset)
+    file.write(
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (len(objects) + 1, xref)
+    )
+    return file.getvalue()
+
+
+SAMPLES: dict[str, Callable[[int], bytes]] = {
+    "pdf": make_pdf,
+    "txt": make_txt,
+    "py": make_py,
+    "docx": make_docx,
+    "odt": make_odt,
+    "ipynb": make_ipynb,
+    "zip": make_zip,
+}
+
+
+def median_ms(func: Callable[[], object], repeat: int) -> float:
+    times = []
+    for __ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started_at)
+    return statistics.median(times) * 1000
+
+
+async def run(args: argparse.Namespace) -> None:
+    for name, value in DUMMY_ENV.items():
+        os.environ.setdefault(name, value)
+    from app import config
+    from app.services.extract import extractor_pool, get_extractor
+
+    limit = config.EXTRACT_SYMBOLS_LIMIT
+    print(f"limit={limit} characters, size={args.size} MB, repeat={args.repeat}")
+    print(
+        f"\n{'format':6} {'size KB':>8} {'chars':>7} {'limited ms':>11} "
+        f"{'full ms':>9} {'full chars':>11} {'pool ms':>8}"
+    )
+    for file_ext in args.formats:
+        data = SAMPLES[file_ext](args.size * 1024 * 1024)
+        func = get_extractor(file_ext)
+        text = func(data, limit)
+        full_text = func(data, sys.maxsize)
+        limited = median_ms(lambda: func(data, limit), args.repeat)  # noqa: B023
+        full = median_ms(lambda: func(data, sys.maxsize), args.repeat)  # noqa: B023
+
+        await extractor_pool.run(func, data)  # start workers
+        times = []
+        for __ in range(args.repeat):
+            started_at = time.perf_counter()
+            await extractor_pool.run(func, data)
+            times.append(time.perf_counter() - started_at)
+        pool = statistics.median(times) * 1000
+        print(
+            f"{file_ext:6} {len(data) // 1024:8} {len(text):7} {limited:11.1f} "
+            f"{full:9.1f} {len(full_text):11} {pool:8.1f}"
+        )
+    extractor_pool.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--size", type=int, default=5, help="Approximate size of samples, MB"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--formats",
+        type=lambda value: value.split(","),
+        default=list(SAMPLES),
+        help="Comma-separated extensions, all by default",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Local stand-in for Yandex Foundation Models API, for GPT_API_URL.
+
+Answers completion and completionAsync requests after a random delay and
+fails a share of requests with 429/5xx. Async operations report done=false
+until their delay passes; a share of them can be made to never finish.
+
+Can run standalone:
+    python -m benchmarks.fake_gpt --port 8090 --latency lognormal:1.5:0.4
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import itertools
+import math
+import random
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+
+Latency = Callable[[], float]
+
+ANSWERS = [
+    "Математика, Линейная алгебра",
+    "Физика, Электродинамика",
+    "Информатика, Алгоритмы",
+    "History, World War II",
+    "Биология, Генетика",
+]
+
+
+def parse_latency(spec: str) -> Latency:
+    """
+    :param spec: Distribution of response time in seconds: "fixed:S",
+        "uniform:MIN:MAX", "lognormal:MEDIAN:SIGMA" or "exp:MEAN"
+    """
+    kind, *params = spec.split(":")
+    values = [float(param) for param in params]
+    match kind, values:
+        case "fixed", [seconds]:
+            return lambda: seconds
+        case "uniform", [low, high]:
+            return lambda: random.uniform(low, high)
+        case "lognormal", [median, sigma]:
+            return lambda: random.lognormvariate(math.log(median), sigma)
+        case "exp", [mean]:
+            return lambda: random.expovariate(1 / mean)
+    raise ValueError(f"Invalid latency: {spec}")
+
+
+@dataclass
+class Behaviour:
+    latency: Latency
+    # share of requests, including operation polls, answered with an error
+    error_rate: float = 0.0
+    error_statuses: tuple[int, ...] = (429, 500, 503)
+    # share of async operations that stay done=false forever
+    stuck_rate: float = 0.0
+
+
+@dataclass
+class Stats:
+    requests: Counter[str] = field(default_factory=Counter)
+    errors: int = 0
+    completions: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+
+class FakeGPT:
+    """
+    Start with start(), stop with stop().
+    """
+
+    def __init__(
+        self, behaviour: Behaviour, host: str = "127.0.0.1", port: int = 0
+    ) -> None:
+        self.behaviour = behaviour
+        self.host = host
+        self.port = port
+        self.stats = Stats()
+        # operation id -> (monotonic time it is done at, response)
+        self.operations: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._ids = itertools.count(1)
+        self._runner: web.AppRunner | None = None
+
+        self.app = web.Application(middlewares=[self.inject_errors])
+        self.app.router.add_post("/foundationModels/v1/completion", self.completion)
+        self.app.router.add_post(
+            "/foundationModels/v1/completionAsync", self.completion_async
+        )
+        self.app.router.add_get("/operations/{id}", self.operation)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    @web.middleware
+    async def inject_errors(
+        self, request: web.Request, handler: Callable
+    ) -> web.StreamResponse:
+        path = request.path
+        self.stats.requests["operations" if "/operations/" in path else path] += 1
+        if random.random() < self.behaviour.error_rate:
+            self.stats.errors += 1
+            status = random.choice(self.behaviour.error_statuses)
+            return web.json_response({"error": "injected"}, status=status)
+        return await handler(request)
+
+    def _result(self, body: dict[str, Any]) -> dict[str, Any]:
+        text = body["messages"][-1]["text"]
+        digest = hashlib.sha256(text.encode()).digest()
+        return {
+            "alternatives": [
+                {
+                    "message": {
+                        "role": "assistant",
+                        "text": ANSWERS[digest[0] % len(ANSWERS)],
+                    },
+                    "status": "ALTERNATIVE_STATUS_FINAL",
+                }
+            ],
+            "usage": {
+                "inputTextTokens": str(len(text) // 4),
+                "completionTokens": "6",
+                "totalTokens": str(len(text) // 4 + 6),
+            },
+            "modelVersion": "fake",
+        }
+
+    def _sample_latency(self) -> float:
+        latency = max(self.behaviour.latency(), 0.0)
+        self.stats.latencies.append(latency)
+        self.stats.completions += 1
+        return latency
+
+    async def completion(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.stats.in_flight += 1
+        self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+        try:
+            await asyncio.sleep(self._sample_latency())
+        finally:
+            self.stats.in_flight -= 1
+        return web.json_response({"result": self._result(body)})
+
+    async def completion_async(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        operation_id = f"op{next(self._ids)}"
+        done_at = time.monotonic() + self._sample_latency()
+        if random.random() < self.behaviour.stuck_rate:
+            done_at = math.inf
+        self.operations[operation_id] = (done_at, self._result(body))
+
+        pending = sum(
+            1 for done_at, __ in self.operations.values() if done_at > time.monotonic()
+        )
+        self.stats.max_in_flight = max(self.stats.max_in_flight, pending)
+        return web.json_response({"id": operation_id, "done": False})
+
+    async def operation(self, request: web.Request) -> web.Response:
+        operation_id = request.match_info["id"]
+        if operation_id not in self.operations:
+            raise web.HTTPNotFound
+        done_at, result = self.operations[operation_id]
+        if time.monotonic() < done_at:
+            return web.json_response({"id": operation_id, "done": False})
+        del self.operations[operation_id]
+        return web.json_response({"id": operation_id, "done": True, "response": result})
+
+
+def add_behaviour_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--latency",
+        default="lognormal:1.5:0.4",
+        help='Response time, seconds: "fixed:S", "uniform:MIN:MAX", '
+        '"lognormal:MEDIAN:SIGMA" or "exp:MEAN"',
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Share of 429/5xx responses"
+    )
+    parser.add_argument(
+        "--stuck-rate",
+        type=float,
+        default=0.0,
+        help="Share of async operations that never finish",
+    )
+
+
+def behaviour_from_args(args: argparse.Namespace) -> Behaviour:
+    return Behaviour(
+        latency=parse_latency(args.latency),
+        error_rate=args.error_rate,
+        stuck_rate=args.stuck_rate,
+    )
+
+
+async def serve(args: argparse.Namespace) -> None:
+    server = FakeGPT(behaviour_from_args(args), args.host, args.port)
+    await server.start()
+    print(f"Serving on {server.url}, set GPT_API_URL to it")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    add_behaviour_arguments(parser)
+    args = parser.parse_args()
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""
+Local stand-in for the Bot API, enough to run the bot against.
+
+Serves /bot<token>/<method> and /file/bot<token>/<path> like api.telegram.org,
+so the bot only needs TELEGRAM_API_URL pointed to it. Updates are delivered
+by getUpdates or pushed to the webhook set by setWebhook. Messages sent by
+the bot are kept per chat, so simulated users can press their buttons.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiohttp import ClientSession, web
+from multidict import MultiDictProxy
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {
+    "id": 100500,
+    "is_bot": True,
+    "first_name": "EduLink",
+    "username": "edulink_bench_bot",
+}
+
+# parameters of object types, sent as JSON
+JSON_PARAMS = {
+    "allowed_updates", "commands", "entities", "link_preview_options", "media",
+    "reply_markup", "reply_parameters", "scope",
+}  # fmt: skip
+
+Method = Callable[["FakeTelegram", dict[str, Any]], Awaitable[Any]]
+
+
+class FakeTelegram:
+    """
+    In-memory Bot API server. Start with start(), stop with stop().
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.host = host
+        self.port = port
+        self.calls: Counter[str] = Counter()
+        # chat id -> message id -> message sent by the bot
+        self.messages: defaultdict[int, dict[int, dict]] = defaultdict(dict)
+        self.files: dict[str, bytes] = {}
+        self.file_names: dict[str, str] = {}
+        self.webhook_url = ""
+
+        self._ids = itertools.count(1)
+        # (chat id, predicate, future) of wait_message() calls
+        self._watchers: list[tuple[int, Callable[[dict], bool], asyncio.Future]] = []
+        self._pending: list[dict] = []
+        self._new_updates = asyncio.Event()
+        self._webhook_secret = ""
+        self._webhook_queue: asyncio.Queue[dict] = asyncio.Queue()
+        self._webhook_tasks: list[asyncio.Task] = []
+        self._webhook_session: ClientSession | None = None
+        self._runner: web.AppRunner | None = None
+
+        self.app = web.Application(client_max_size=64 * 1024 * 1024)
+        self.app.router.add_post("/bot{token}/{method}", self.handle_method)
+        self.app.router.add_get("/file/bot{token}/{path:.+}", self.handle_file)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        await self._stop_webhook()
+        if self._runner:
+            await self._runner.cleanup()
+
+    def next_id(self) -> int:
+        """
+        IDs of updates, messages and files share one counter.
+        """
+        return next(self._ids)
+
+    def add_file(self, data: bytes, file_name: str) -> str:
+        file_id = f"file{self.next_id()}"
+        self.files[file_id] = data
+        self.file_names[file_id] = file_name
+        return file_id
+
+    def file_unique_id(self, file_id: str) -> str:
+        """
+        Equal for files with equal contents, as uploads are deduplicated
+        by Telegram.
+        """
+        return hashlib.sha256(self.files[file_id]).hexdigest()[:16]
+
+    def document(self, file_id: str) -> dict[str, Any]:
+        return {
+            "file_id": file_id,
+            "file_unique_id": self.file_unique_id(file_id),
+            "file_name": self.file_names[file_id],
+            "file_size": len(self.files[file_id]),
+        }
+
+    def put_update(self, update: dict[str, Any]) -> int:
+        """
+        Queues update for delivery.
+        :return: ID assigned to the update
+        """
+        update_id = self.next_id()
+        update = {"update_id": update_id} | update
+        if self.webhook_url:
+            self._webhook_queue.put_nowait(update)
+        else:
+            self._pending.append(update)
+            self._new_updates.set()
+        return update_id
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method_name = request.match_info["method"]
+        self.calls[method_name] += 1
+        method = METHODS.get(method_name.lower())
+        if method is None:
+            return web.json_response(
+                {"ok": False, "error_code": 404, "description": "Not Found"},
+                status=404,
+            )
+
+        params = parse_params(await request.post())
+        try:
+            result = await method(self, params)
+        except LookupError as e:
+            return web.json_response(
+                {"ok": False, "error_code": 400, "description": f"Bad Request: {e}"},
+                status=400,
+            )
+        return web.json_response({"ok": True, "result": result})
+
+    async def handle_file(self, request: web.Request) -> web.Response:
+        file_id = request.match_info["path"].rsplit("/", maxsplit=1)[-1]
+        if file_id not in self.files:
+            raise web.HTTPNotFound
+        return web.Response(body=self.files[file_id])
+
+    def wait_message(
+        self, chat_id: int, predicate: Callable[[dict], bool]
+    ) -> asyncio.Future:
+        """
+        :return: Future of the first message sent or edited in the chat from
+            now on that matches predicate
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._watchers.append((chat_id, predicate, future))
+        return future
+
+    def _changed(self, chat_id: int, message: dict[str, Any]) -> None:
+        for watcher in list(self._watchers):
+            watcher_chat_id, predicate, future = watcher
+            if future.done():
+                self._watchers.remove(watcher)
+            elif watcher_chat_id == chat_id and predicate(message):
+                future.set_result(message)
+                self._watchers.remove(watcher)
+
+    def _store_message(self, chat_id: int, message: dict[str, Any]) -> dict[str, Any]:
+        self.messages[chat_id][message["message_id"]] = message
+        self._changed(chat_id, message)
+        return message
+
+    def _new_message(self, params: dict[str, Any], **fields: Any) -> dict[str, Any]:
+        chat_id = int(params["chat_id"])
+        message = {
+            "message_id": self.next_id(),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            **fields,
+        }
+        if markup := params.get("reply_markup"):
+            message["reply_markup"] = markup
+        return self._store_message(chat_id, message)
+
+    def _get_message(self, params: dict[str, Any]) -> dict[str, Any]:
+        chat_id = int(params["chat_id"])
+        message_id = int(params["message_id"])
+        try:
+            return self.messages[chat_id][message_id]
+        except KeyError:
+            raise LookupError("message to edit not found") from None
+
+    async def _deliver_webhook(self) -> None:
+        headers = {}
+        if self._webhook_secret:
+            headers["X-Telegram-Bot-Api-Secret-Token"] = self._webhook_secret
+        while True:
+            update = await self._webhook_queue.get()
+            try:
+                async with self._webhook_session.post(
+                    self.webhook_url, json=update, headers=headers
+                ) as response:
+                    await response.read()
+            except Exception:
+                logger.exception("Failed to deliver update %d", update["update_id"])
+
+    async def _stop_webhook(self) -> None:
+        for task in self._webhook_tasks:
+            task.cancel()
+        await asyncio.gather(*self._webhook_tasks, return_exceptions=True)
+        self._webhook_tasks.clear()
+        if self._webhook_session:
+            await self._webhook_session.close()
+            self._webhook_session = None
+        self.webhook_url = ""
+
+
+def parse_params(form: MultiDictProxy) -> dict[str, Any]:
+    """
+    aiogram sends nested objects as JSON strings and files as multipart fields.
+    """
+    params = {}
+    for key, value in form.items():
+        if isinstance(value, web.FileField):
+            params[key] = (value.filename, value.file.read())
+        elif key in JSON_PARAMS:
+            params[key] = json.loads(value)
+        else:
+            params[key] = value
+    return params
+
+
+async def get_me(__: FakeTelegram, ___: dict[str, Any]) -> dict[str, Any]:
+    return BOT_USER
+
+
+async def get_updates(api: FakeTelegram, params: dict[str, Any]) -> list[dict]:
+    offset = int(params.get("offset", 0))
+    api._pending = [u for u in api._pending if u["update_id"] >= offset]
+    if not api._pending:
+        api._new_updates.clear()
+        try:
+            await asyncio.wait_for(
+                api._new_updates.wait(), float(params.get("timeout", 0))
+            )
+        except TimeoutError:
+            return []
+    return api._pending[: int(params.get("limit", 100))]
+
+
+async def set_webhook(api: FakeTelegram, params: dict[str, Any]) -> bool:
+    await api._stop_webhook()
+    api.webhook_url = params["url"]
+    api._webhook_secret = params.get("secret_token", "")
+    # pending updates are moved to the webhook, as Telegram does
+    for update in api._pending:
+        api._webhook_queue.put_nowait(update)
+    api._pending.clear()
+
+    api._webhook_session = ClientSession()
+    connections = int(params.get("max_connections", 40))
+    api._webhook_tasks = [
+        asyncio.create_task(api._deliver_webhook()) for __ in range(connections)
+    ]
+    return True
+
+
+async def delete_webhook(api: FakeTelegram, __: dict[str, Any]) -> bool:
+    await api._stop_webhook()
+    return True
+
+
+async def ok(__: FakeTelegram, ___: dict[str, Any]) -> bool:
+    return True
+
+
+async def delete_message(api: FakeTelegram, params: dict[str, Any]) -> bool:
+    message = api._get_message(params)
+    del api.messages[message["chat"]["id"]][message["message_id"]]
+    return True
+
+
+async def send_message(api: FakeTelegram, params: dict[str, Any]) -> dict[str, Any]:
+    return api._new_message(params, text=params["text"])
+
+
+async def edit_message_text(
+    api: FakeTelegram, params: dict[str, Any]
+) -> dict[str, Any]:
+    message = api._get_message(params)
+    message["text"] = params["text"]
+    message["edit_date"] = int(time.time())
+    message.pop("document", None)
+    message["reply_markup"] = params.get("reply_markup")
+    api._changed(message["chat"]["id"], message)
+    return message
+
+
+async def edit_message_reply_markup(
+    api: FakeTelegram, params: dict[str, Any]
+) -> dict[str, Any]:
+    message = api._get_message(params)
+    message["reply_markup"] = params.get("reply_markup")
+    return message
+
+
+async def edit_message_caption(
+    api: FakeTelegram, params: dict[str, Any]
+) -> dict[str, Any]:
+    message = api._get_message(params)
+    message["caption"] = params.get("caption", "")
+    message["reply_markup"] = params.get("reply_markup")
+    return message
+
+
+async def send_document(api: FakeTelegram, params: dict[str, Any]) -> dict[str, Any]:
+    document = params["document"]
+    if document.startswith("attach://"):
+        file_name, data = params[document.removeprefix("attach://")]
+        document = api.add_file(data, file_name)
+    elif document not in api.files:
+        raise LookupError("wrong file identifier")
+
+    fields = {"document": api.document(document)}
+    if caption := params.get("caption"):
+        fields["caption"] = caption
+    return api._new_message(params, **fields)
+
+
+async def edit_message_media(
+    api: FakeTelegram, params: dict[str, Any]
+) -> dict[str, Any]:
+    message = api._get_message(params)
+    media = params["media"]
+    file_id = media["media"]
+    if file_id.startswith("attach://"):
+        file_name, data = params[file_id.removeprefix("attach://")]
+        file_id = api.add_file(data, file_name)
+    message.pop("text", None)
+    message["document"] = api.document(file_id)
+    message["caption"] = media.get("caption", "")
+    message["reply_markup"] = params.get("reply_markup")
+    return message
+
+
+async def get_file(api: FakeTelegram, params: dict[str, Any]) -> dict[str, Any]:
+    file_id = params["file_id"]
+    if file_id not in api.files:
+        raise LookupError("wrong file_id specified")
+    return {
+        "file_id": file_id,
+        "file_unique_id": api.file_unique_id(file_id),
+        "file_size": len(api.files[file_id]),
+        "file_path": f"documents/{file_id}",
+    }
+
+
+METHODS: dict[str, Method] = {
+    "getme": get_me,
+    "getupdates": get_updates,
+    "setwebhook": set_webhook,
+    "deletewebhook": delete_webhook,
+    "setmycommands": ok,
+    "answercallbackquery": ok,
+    "deletemessage": delete_message,
+    "sendchataction": ok,
+    "sendmessage": send_message,
+    "editmessagetext": edit_message_text,
+    "editmessagereplymarkup": edit_message_reply_markup,
+    "editmessagecaption": edit_message_caption,
+    "editmessagemedia": edit_message_media,
+    "senddocument": send_document,
+    "getfile": get_file,
+}
@@ -0,0 +1,134 @@
+"""
+What each GPT_SAMPLING strategy sends to GPT from a long report.
+
+Generates reports like those students submit: a title page, a table of
+contents, sections of text with a running header and page numbers on every
+page. Each section mentions its own term ("topic7"), so that its presence
+in a sample can be checked. For each strategy prints the characters sent,
+the share of them taken by title page, contents and page furniture, how
+many sections the sample covers and the time of sampling.
+
+Run from the repository root:
+    python -m benchmarks.sampling --size 30 --budget 3000
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import time
+from collections.abc import Callable
+
+from benchmarks.extract import DUMMY_ENV, random_line
+
+TITLE_PAGE = [
+    "Министерство науки и высшего образования Российской Федерации",
+    "Федеральное государственное автономное образовательное учреждение",
+    "высшего образования",
+    "Кафедра прикладной математики",
+    "ОТЧЁТ",
+    "Выполнил: студент группы ПМ-21 Иванов И. И.",
+    "Проверил: доцент Петров П. П.",
+    "Москва 2026",
+]
+TOPIC_RE = re.compile(r"topic\d+")
+# Characters of text between page footers
+PAGE_SYMBOLS = 2000
+
+
+def make_report(size: int, sections: int) -> tuple[str, set[str]]:
+    """
+    :return: Text of about `size` characters and its boilerplate lines
+    """
+    boilerplate = [*TITLE_PAGE, "Содержание"]
+    lines = list(TITLE_PAGE)
+    lines.append("Содержание")
+    for section in range(1, sections + 1):
+        line = f"{section}. Раздел topic{section} " + "." * 20 + f" {section * 3}"
+        lines.append(line)
+        boilerplate.append(line)
+
+    per_section = (size - sum(len(line) + 1 for line in lines)) // sections
+    page = 1
+    page_length = 0
+    for section in range(1, sections + 1):
+        lines.append(f"{section}. Раздел topic{section}")
+        length = 0
+        while length < per_section:
+            line = f"{random_line()} topic{section} {random_line()}"
+            lines.append(line)
+            length += len(line) + 1
+            page_length += len(line) + 1
+            if page_length >= PAGE_SYMBOLS:
+                footer = ["Отчёт по лабораторной работе", f"Страница {page}"]
+                lines.extend(footer)
+                boilerplate.extend(footer)
+                page += 1
+                page_length = 0
+    return "\n".join(lines), set(boilerplate)
+
+
+def measure(
+    func: Callable[[str, int], str],
+    text: str,
+    budget: int,
+    boilerplate: set[str],
+    repeat: int,
+) -> tuple[str, float, float]:
+    times = []
+    for __ in range(repeat):
+        started_at = time.perf_counter()
+        sample = func(text, budget)
+        times.append(time.perf_counter() - started_at)
+    noise = sum(
+        len(line) + 1 for line in sample.splitlines() if line.strip() in boilerplate
+    )
+    return sample, noise / max(len(sample), 1), statistics.median(times) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--size", type=int, default=30, help="Characters of a report, thousands"
+    )
+    parser.add_argument("--sections", type=int, default=10)
+    parser.add_argument(
+        "--budget", type=int, default=3000, help="GPT_SYMBOLS_LIMIT to compare"
+    )
+    parser.add_argument(
+        "--old-budget",
+        type=int,
+        default=7000,
+        help="Characters sent before sampling, compared with the head strategy",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for name, value in DUMMY_ENV.items():
+        os.environ.setdefault(name, value)
+    from app.services.sampling import SAMPLERS
+
+    random.seed(0)
+    text, boilerplate = make_report(args.size * 1000, args.sections)
+    print(f"report of {len(text)} characters, {args.sections} sections")
+    print(
+        f"\n{'strategy':10} {'budget':>7} {'chars':>6} {'boilerplate':>12} "
+        f"{'sections':>9} {'ms':>6}"
+    )
+    runs = [("head", args.old_budget)] + [(name, args.budget) for name in SAMPLERS]
+    for name, budget in runs:
+        sample, noise, ms = measure(
+            SAMPLERS[name], text, budget, boilerplate, args.repeat
+        )
+        # the contents mention every section, only text counts
+        body = [line for line in sample.splitlines() if line not in boilerplate]
+        covered = len(set(TOPIC_RE.findall("\n".join(body))))
+        print(
+            f"{name:10} {budget:7} {len(sample):6} {noise:12.0%} "
+            f"{covered:4}/{args.sections:<4} {ms:6.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
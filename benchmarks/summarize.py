@@ -0,0 +1,171 @@
+"""
+Throughput of homework submissions, with summaries from a fake Yandex GPT.
+
+Students submit .txt files at several concurrency levels. Every submission
+is enqueued by homework_handler and processed by the homework queue:
+download, get_file_summary, summarization (a GPT call, texts are unique so
+the summary cache always misses), upload and saving to the database. A
+submission counts as done when its status message is edited. Prints
+submissions per minute for each level next to the limit set by
+GPT_CONCURRENCY, HOMEWORK_WORKERS and GPT latency.
+
+Run from the repository root:
+    python -m benchmarks.summarize --levels 1,5,10,25,50
+    python -m benchmarks.summarize --latency fixed:3 --error-rate 0.05 --async-api
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+
+from benchmarks.fake_gpt import FakeGPT, add_behaviour_arguments, behaviour_from_args
+from benchmarks.fake_telegram import FakeTelegram
+from benchmarks.load import (
+    STUDENT_ID_BASE,
+    TEACHER_ID_BASE,
+    Recorder,
+    SimulatedUser,
+    add_bot_arguments,
+    percentile,
+    run_phase,
+    running_bot,
+)
+
+WORDS = [
+    "матрица", "вектор", "базис", "ранг", "определитель", "интеграл",
+    "производная", "предел", "ряд", "функция", "алгоритм", "сложность", "граф",
+    "дерево", "очередь", "стек", "массив", "список", "энергия", "импульс",
+    "сила", "поле", "заряд", "ток", "напряжение", "волна", "частота",
+]  # fmt: skip
+
+
+def random_text(size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = random.choice(WORDS)
+        words.append(word)
+        length += len(word) * 2 + 1  # cyrillic letters take 2 bytes
+    return " ".join(words)
+
+
+async def run(args: argparse.Namespace) -> None:
+    gpt = FakeGPT(behaviour_from_args(args))
+    await gpt.start()
+    os.environ.update(
+        GPT_API_URL=gpt.url,
+        GPT_ASYNC_API="true" if args.async_api else "false",
+        GPT_CONCURRENCY=str(args.gpt_concurrency),
+        GPT_TIMEOUT=str(args.gpt_timeout),
+        HOMEWORK_WORKERS=str(args.workers),
+    )
+
+    api = FakeTelegram()
+    await api.start()
+    recorder = Recorder()
+    students = [
+        SimulatedUser(api, recorder, STUDENT_ID_BASE + i, f"Student{i}")
+        for i in range(args.submissions * len(args.levels))
+    ]
+    invite_codes = []
+
+    async def seed() -> None:
+        from app.models import Container, User
+
+        teacher = await User.create(
+            id=TEACHER_ID_BASE, fio="Teacher Benchmark", lang_code="en"
+        )
+        container = await Container.create(name="Course", owner=teacher)
+        await User.bulk_create(
+            User(id=user.user["id"], fio=f"Student{i} Benchmark", lang_code="en")
+            for i, user in enumerate(students)
+        )
+        invite_codes.append(container.invite_code)
+
+    async def open_upload(user: SimulatedUser) -> None:
+        await user.send_text("join", f"/start cjoin_{invite_codes[0]}")
+        await user.press("open upload", "Upload your solution")
+
+    results = []
+    async with running_bot(args, api, recorder, seed):
+        for number, level in enumerate(args.levels):
+            users = students[
+                number * args.submissions : (number + 1) * args.submissions
+            ]
+            await run_phase("prepare", [open_upload(u) for u in users], recorder, 50)
+
+            step = f"submit x{level}"
+            completions = gpt.stats.completions
+            __, __, submissions, elapsed = await run_phase(
+                step,
+                [
+                    user.submit(
+                        step, "essay.txt", random_text(args.text_size * 1024).encode()
+                    )
+                    for user in users
+                ],
+                recorder,
+                level,
+            )
+            results.append(
+                (level, submissions, elapsed, gpt.stats.completions - completions)
+            )
+    await api.stop()
+    await gpt.stop()
+
+    mean_latency = statistics.fmean(gpt.stats.latencies or [0.0])
+    print(
+        f"\ndatabase={args.database.split(':')[0]} latency={args.latency} "
+        f"error_rate={args.error_rate} async_api={args.async_api} "
+        f"gpt_concurrency={args.gpt_concurrency} workers={args.workers}"
+    )
+    limit = min(args.gpt_concurrency, args.workers) / max(mean_latency, 1e-3) * 60
+    print(f"GPT latency mean {mean_latency:.2f} s, limit {limit:.0f} submissions/min")
+    print(
+        f"\n{'level':>5} {'done':>5} {'errors':>6} {'seconds':>8} {'per min':>8} "
+        f"{'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'GPT calls':>9}"
+    )
+    for level, submissions, elapsed, completions in results:
+        step = f"submit x{level} done"
+        values = recorder.latencies[step]
+        print(
+            f"{level:5} {submissions:5} {recorder.errors[step]:6} {elapsed:8.2f} "
+            f"{submissions / elapsed * 60:8.1f} {percentile(values, 50):7.2f} "
+            f"{percentile(values, 95):7.2f} {percentile(values, 99):7.2f} "
+            f"{completions:9}"
+        )
+    print(
+        f"\nGPT requests: {dict(gpt.stats.requests)}, errors {gpt.stats.errors}, "
+        f"max in flight {gpt.stats.max_in_flight}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--levels",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 5, 10, 25, 50],
+        help="Comma-separated numbers of students submitting at once",
+    )
+    parser.add_argument(
+        "--submissions", type=int, default=50, help="Submissions per level"
+    )
+    parser.add_argument(
+        "--text-size", type=int, default=8, help="Size of submitted texts, KB"
+    )
+    parser.add_argument("--async-api", action="store_true", help="Use completionAsync")
+    parser.add_argument("--gpt-concurrency", type=int, default=10)
+    parser.add_argument("--gpt-timeout", type=float, default=30)
+    parser.add_argument(
+        "--workers", type=int, default=10, help="HOMEWORK_WORKERS of the bot"
+    )
+    add_behaviour_arguments(parser)
+    add_bot_arguments(parser)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
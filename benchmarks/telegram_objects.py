@@ -0,0 +1,138 @@
+"""
+Micro-benchmark of LazyProxy patches from app/monkeypatch.py.
+
+Measures parsing of incoming updates, building of keyboards (done by widgets
+on every render) and building of outgoing methods, in three modes:
+  stock   - aiogram without patches
+  legacy  - LazyProxy unwrapped in TelegramObject and TelegramMethod __init__
+  current - patches from app/monkeypatch.py
+
+Run from the repository root, with .env filled:
+    python -m benchmarks.telegram_objects [-n 20000]
+"""
+
+import argparse
+import subprocess
+import sys
+import timeit
+from typing import Any
+
+MODES = ["stock", "legacy", "current"]
+
+MESSAGE_UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 10,
+        "date": 1700000000,
+        "chat": {"id": 42, "type": "private", "first_name": "Ivan"},
+        "from": {
+            "id": 42,
+            "is_bot": False,
+            "first_name": "Ivan",
+            "last_name": "Ivanov",
+            "language_code": "ru",
+        },
+        "text": "/start cjoin_AbCdEf1234",
+        "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+    },
+}
+CALLBACK_UPDATE = {
+    "update_id": 2,
+    "callback_query": {
+        "id": "123",
+        "chat_instance": "456",
+        "data": "s_homeworks:15",
+        "from": {"id": 42, "is_bot": False, "first_name": "Ivan"},
+        "message": {
+            "message_id": 11,
+            "date": 1700000000,
+            "chat": {"id": 42, "type": "private", "first_name": "Ivan"},
+            "from": {"id": 1, "is_bot": True, "first_name": "Bot"},
+            "text": "Homeworks",
+            "reply_markup": {
+                "inline_keyboard": [
+                    [{"text": f"Student {i}", "callback_data": f"s_homeworks:{i}"}]
+                    for i in range(10)
+                ],
+            },
+        },
+    },
+}
+
+
+def apply_legacy_patch() -> None:
+    from aiogram.methods.base import TelegramMethod
+    from aiogram.types.base import TelegramObject
+    from babel.support import LazyProxy
+
+    def method_init(self: TelegramMethod, /, **kwargs: Any) -> None:
+        for key, value in kwargs.items():
+            if isinstance(value, LazyProxy):
+                kwargs[key] = value.value
+        super(TelegramMethod, self).__init__(**kwargs)
+
+    def object_init(self: TelegramObject, /, **kwargs: Any) -> None:
+        for key, value in kwargs.items():
+            if isinstance(value, LazyProxy):
+                kwargs[key] = value.value
+        super(TelegramObject, self).__init__(**kwargs)
+
+    TelegramObject.__init__ = object_init
+    TelegramMethod.__init__ = method_init
+
+
+def run(mode: str, number: int) -> None:
+    if mode == "legacy":
+        apply_legacy_patch()
+    elif mode == "current":
+        import app.monkeypatch  # noqa: F401
+
+    from aiogram.methods import SendMessage
+    from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Update
+    from babel.support import LazyProxy
+
+    text = LazyProxy(lambda: "Done!", enable_cache=False)
+
+    def build_keyboard() -> InlineKeyboardMarkup:
+        return InlineKeyboardMarkup(
+            inline_keyboard=[
+                [InlineKeyboardButton(text=f"Student {i}", callback_data=f"s:{i}")]
+                for i in range(10)
+            ]
+        )
+
+    cases = {
+        "parse message update": lambda: Update.model_validate(MESSAGE_UPDATE),
+        "parse callback update": lambda: Update.model_validate(CALLBACK_UPDATE),
+        "Update(**data)": lambda: Update(**MESSAGE_UPDATE),
+        "build 10-button keyboard": build_keyboard,
+        "build SendMessage": lambda: SendMessage(chat_id=42, text=text),
+    }
+    for name, func in cases.items():
+        if mode == "stock" and name == "build SendMessage":
+            continue  # LazyProxy is not accepted without patches
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        print(f"{mode:8} {name:26} {seconds / number * 1e6:8.2f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--number", type=int, default=20000)
+    parser.add_argument("--mode", choices=MODES)
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args.mode, args.number)
+        return
+
+    # patches are global, so every mode runs in a fresh interpreter
+    for mode in MODES:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.telegram_objects"]
+            + ["--mode", mode, "-n", str(args.number)],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
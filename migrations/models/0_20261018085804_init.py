@@ -0,0 +1,47 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "user" (
+    "id" BIGSERIAL NOT NULL PRIMARY KEY,
+    "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "lang_code" VARCHAR(2),
+    "fio" TEXT
+);
+CREATE TABLE IF NOT EXISTS "container" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "invite_code" TEXT NOT NULL,
+    "name" TEXT NOT NULL,
+    "is_archived" BOOL NOT NULL DEFAULT False,
+    "description" TEXT,
+    "deadline" TIMESTAMPTZ,
+    "owner_id" BIGINT NOT NULL REFERENCES "user" ("id") ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS "homework" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "name" TEXT NOT NULL,
+    "text" TEXT,
+    "file_id" TEXT NOT NULL,
+    "mark" INT,
+    "container_id" INT NOT NULL REFERENCES "container" ("id") ON DELETE CASCADE,
+    "owner_id" BIGINT NOT NULL REFERENCES "user" ("id") ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS "aerich" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "version" VARCHAR(255) NOT NULL,
+    "app" VARCHAR(100) NOT NULL,
+    "content" JSONB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS "container_user" (
+    "container_id" INT NOT NULL REFERENCES "container" ("id") ON DELETE CASCADE,
+    "user_id" BIGINT NOT NULL REFERENCES "user" ("id") ON DELETE CASCADE
+);
+CREATE UNIQUE INDEX IF NOT EXISTS "uidx_container_u_contain_ca7174" ON "container_user" ("container_id", "user_id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        """
@@ -0,0 +1,34 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "container" ADD COLUMN IF NOT EXISTS "version" INT NOT NULL DEFAULT 0;
+        CREATE TABLE IF NOT EXISTS "summary" (
+    "digest" VARCHAR(64) NOT NULL PRIMARY KEY,
+    "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "used_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "summary" TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS "idx_summary_used_at_e8796e" ON "summary" ("used_at");
+COMMENT ON TABLE "summary" IS 'GPT summary of a homework text, keyed by SHA-256 of the normalized text.';
+CREATE TABLE IF NOT EXISTS "exportartifact" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "kind" VARCHAR(9) NOT NULL,
+    "lang_code" VARCHAR(2) NOT NULL DEFAULT '',
+    "version" INT NOT NULL,
+    "file_id" TEXT NOT NULL,
+    "homework_ids" JSONB NOT NULL,
+    "container_id" INT NOT NULL REFERENCES "container" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_exportartif_contain_41184d" UNIQUE ("container_id", "kind", "lang_code")
+);
+COMMENT ON COLUMN "exportartifact"."kind" IS 'FILES: files\nTABLE: table\nTABLE_CSV: table_csv';
+COMMENT ON TABLE "exportartifact" IS 'The latest exported file of a container, already uploaded to Telegram.';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "container" DROP COLUMN "version";
+        DROP TABLE IF EXISTS "exportartifact";
+        DROP TABLE IF EXISTS "summary";"""
@@ -0,0 +1,47 @@
+import logging
+
+from tortoise import BaseDBAsyncClient
+
+logger = logging.getLogger(__name__)
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # duplicate submissions could only appear in a race. The first one is
+    # kept, the others are moved to homework_duplicate, not deleted
+    duplicates = await db.execute_query_dict(
+        """
+        SELECT "id", "container_id", "owner_id" FROM "homework"
+        WHERE "id" NOT IN (
+            SELECT MIN("id") FROM "homework" GROUP BY "container_id", "owner_id"
+        )
+        ORDER BY "id"
+        """
+    )
+    for row in duplicates:
+        logger.warning(
+            "Moving duplicate homework %d of user %d in container %d "
+            "to homework_duplicate",
+            row["id"],
+            row["owner_id"],
+            row["container_id"],
+        )
+    return """
+        CREATE TABLE IF NOT EXISTS "homework_duplicate" (LIKE "homework");
+        INSERT INTO "homework_duplicate" SELECT * FROM "homework" WHERE "id" NOT IN (
+            SELECT MIN("id") FROM "homework" GROUP BY "container_id", "owner_id"
+        );
+        DELETE FROM "homework" WHERE "id" IN (SELECT "id" FROM "homework_duplicate");
+        ALTER TABLE "container" ALTER COLUMN "invite_code" TYPE VARCHAR(16) USING "invite_code"::VARCHAR(16);
+        CREATE INDEX IF NOT EXISTS "idx_container_owner_i_fc13d8" ON "container" ("owner_id", "name");
+        CREATE UNIQUE INDEX IF NOT EXISTS "uid_container_invite__9f9b9b" ON "container" ("invite_code");
+        CREATE UNIQUE INDEX IF NOT EXISTS "uid_homework_contain_2d5d58" ON "homework" ("container_id", "owner_id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "uid_container_invite__9f9b9b";
+        DROP INDEX IF EXISTS "idx_container_owner_i_fc13d8";
+        DROP INDEX IF EXISTS "uid_homework_contain_2d5d58";
+        ALTER TABLE "container" ALTER COLUMN "invite_code" TYPE TEXT USING "invite_code"::TEXT;
+        INSERT INTO "homework" SELECT * FROM "homework_duplicate";
+        DROP TABLE "homework_duplicate";"""
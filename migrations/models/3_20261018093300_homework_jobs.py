@@ -0,0 +1,32 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "homeworkjob" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "chat_id" BIGINT NOT NULL,
+    "message_id" INT NOT NULL,
+    "status_message_id" INT,
+    "text" TEXT,
+    "file_id" TEXT,
+    "file_name" TEXT NOT NULL,
+    "file_ext" TEXT NOT NULL,
+    "status" VARCHAR(7) NOT NULL DEFAULT 'pending',
+    "attempts" INT NOT NULL DEFAULT 0,
+    "run_at" TIMESTAMPTZ NOT NULL,
+    "error" TEXT,
+    "container_id" INT NOT NULL REFERENCES "container" ("id") ON DELETE CASCADE,
+    "homework_id" INT REFERENCES "homework" ("id") ON DELETE CASCADE,
+    "owner_id" BIGINT NOT NULL REFERENCES "user" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_homeworkjob_chat_id_5fbc4f" UNIQUE ("chat_id", "message_id")
+);
+CREATE INDEX IF NOT EXISTS "idx_homeworkjob_status_d1b70b" ON "homeworkjob" ("status", "run_at");
+COMMENT ON COLUMN "homeworkjob"."status" IS 'PENDING: pending\nRUNNING: running\nDONE: done\nFAILED: failed';
+COMMENT ON TABLE "homeworkjob" IS 'Submitted homework, processed into Homework by app/services/homework_jobs.py.';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "homeworkjob";"""
@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "homework" ADD "file_unique_id" VARCHAR(64);
+        ALTER TABLE "homeworkjob" ADD "file_unique_id" VARCHAR(64);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "homework" DROP COLUMN "file_unique_id";
+        ALTER TABLE "homeworkjob" DROP COLUMN "file_unique_id";"""
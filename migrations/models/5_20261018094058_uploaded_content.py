@@ -0,0 +1,22 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "homework" ADD "content_key" VARCHAR(80);
+        CREATE TABLE IF NOT EXISTS "uploadedcontent" (
+    "key" VARCHAR(80) NOT NULL PRIMARY KEY,
+    "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "file_id" TEXT NOT NULL,
+    "file_unique_id" VARCHAR(64) NOT NULL,
+    "title" TEXT NOT NULL
+);
+COMMENT ON TABLE "uploadedcontent" IS 'Named upload of a submitted file or text, keyed by Homework.content_key.';
+        CREATE INDEX IF NOT EXISTS "idx_homework_contain_d072b8" ON "homework" ("container_id", "content_key");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_homework_contain_d072b8";
+        ALTER TABLE "homework" DROP COLUMN "content_key";
+        DROP TABLE IF EXISTS "uploadedcontent";"""